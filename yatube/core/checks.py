@@ -0,0 +1,107 @@
+import importlib.util
+
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+from core.template_backends import compile_templates
+
+
+@register(Tags.templates)
+def check_templates_compile(app_configs, **kwargs):
+    """Сообщить о шаблонах, которые не компилируются."""
+    return [
+        Error(
+            f'Шаблон {name} не компилируется: {error}',
+            id='core.E001',
+        )
+        for name, error in compile_templates().items()
+    ]
+
+
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+# incr в этих бэкендах — чтение и запись: одновременные bump() из
+# posts.cache теряют увеличения версий.
+NON_ATOMIC_INCR_CACHES = (
+    'django.core.cache.backends.filebased.FileBasedCache',
+    'django.core.cache.backends.db.DatabaseCache',
+)
+CACHE_CLIENTS = {
+    'django.core.cache.backends.memcached.MemcachedCache': 'memcache',
+    'django.core.cache.backends.memcached.PyLibMCCache': 'pylibmc',
+    'django_redis.cache.RedisCache': 'django_redis',
+}
+
+
+def _cache_messages():
+    messages = []
+    for alias, config in settings.CACHES.items():
+        backend = config['BACKEND']
+        if backend in PER_PROCESS_CACHES:
+            messages.append(Warning(
+                f'Кеш {alias} ({backend}) не общий для воркеров.',
+                hint='Задайте YATUBE_CACHE=file, memcached или redis.',
+                id='core.W001',
+            ))
+        if backend in NON_ATOMIC_INCR_CACHES:
+            messages.append(Warning(
+                f'Кеш {alias} ({backend}) увеличивает версии лент не '
+                f'атомарно: при одновременных изменениях устаревшая '
+                f'страница может остаться в кеше до конца FEED_CACHE_TTL.',
+                hint='Задайте YATUBE_CACHE=memcached или redis.',
+                id='core.W005',
+            ))
+        client = CACHE_CLIENTS.get(backend)
+        if client and importlib.util.find_spec(client) is None:
+            messages.append(Error(
+                f'Для кеша {alias} не установлен модуль {client}.',
+                id='core.E002',
+            ))
+    return messages
+
+
+def _database_messages():
+    messages = []
+    for alias, config in settings.DATABASES.items():
+        if 'sqlite' not in config['ENGINE']:
+            if not config.get('CONN_MAX_AGE'):
+                messages.append(Warning(
+                    f'База {alias}: новое соединение на каждый запрос.',
+                    hint='Задайте YATUBE_DB_CONN_MAX_AGE.',
+                    id='core.W002',
+                ))
+        elif settings.SQLITE_PRAGMAS.get('journal_mode') != 'WAL':
+            messages.append(Warning(
+                f'База {alias} на SQLite без WAL: чтение блокирует запись.',
+                hint="Добавьте 'journal_mode': 'WAL' в SQLITE_PRAGMAS.",
+                id='core.W003',
+            ))
+    return messages
+
+
+def _template_messages():
+    # Без явных loaders и с DEBUG = False Django сам включает cached.Loader.
+    return [
+        Warning(
+            'Шаблоны разбираются заново на каждый запрос.',
+            hint='Оберните загрузчики в cached.Loader.',
+            id='core.W004',
+        )
+        for config in settings.TEMPLATES
+        if config.get('OPTIONS', {}).get('loaders')
+        and 'django.template.loaders.cached.Loader'
+        not in str(config['OPTIONS']['loaders'])
+    ]
+
+
+@register(Tags.caches, Tags.templates)
+def check_performance_settings(app_configs, **kwargs):
+    """Предупредить о медленной конфигурации боевого профиля.
+
+    Смотрится профиль, а не DEBUG: тестовый прогон выключает DEBUG сам.
+    """
+    if settings.ENVIRONMENT != 'prod':
+        return []
+    return _cache_messages() + _database_messages() + _template_messages()
@@ -0,0 +1,159 @@
+"""Замеры производительности запроса.
+
+PerformanceMiddleware заводит RequestMetrics на время запроса, а хуки
+(обертка SQL, шаблонный бэкенд, кеш лент, миниатюры) дописывают в него
+время и счетчики через timed() и count(). Итоги уходят в Server-Timing,
+структурированный лог и гистограммы по именам URL для /metrics/.
+"""
+import contextlib
+import contextvars
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+_metrics = contextvars.ContextVar('request_metrics', default=None)
+# Виды замеров, которые сейчас идут в этом потоке выполнения: вложенный
+# замер того же вида (render_to_string внутри шаблона) не считается дважды.
+_running = contextvars.ContextVar('running_timers', default=frozenset())
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+        # Запросы страницы могут идти из нескольких потоков (core.parallel).
+        self.lock = threading.Lock()
+
+    def add(self, kind, seconds):
+        with self.lock:
+            self.durations[kind] += seconds
+            self.counts[kind] += 1
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        parts = [
+            f'{kind};dur={seconds * 1000:.1f};desc="{self.counts[kind]}"'
+            for kind, seconds in self.durations.items()
+        ]
+        hits, misses = self.counts['cache_hit'], self.counts['cache_miss']
+        if hits or misses:
+            parts.append(f'cache;desc="hit={hits} miss={misses}"')
+        parts.append(f'total;dur={self.elapsed() * 1000:.1f}')
+        return ', '.join(parts)
+
+    def as_dict(self):
+        data = {
+            f'{kind}_ms': round(seconds * 1000, 2)
+            for kind, seconds in self.durations.items()
+        }
+        data.update(
+            (f'{kind}_count', number) for kind, number in self.counts.items()
+        )
+        data['total_ms'] = round(self.elapsed() * 1000, 2)
+        return data
+
+
+def current():
+    return _metrics.get()
+
+
+@contextlib.contextmanager
+def collect():
+    metrics = RequestMetrics()
+    token = _metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _metrics.reset(token)
+
+
+@contextlib.contextmanager
+def timed(kind):
+    metrics = current()
+    running = _running.get()
+    if metrics is None or kind in running:
+        yield
+        return
+    token = _running.set(running | {kind})
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _running.reset(token)
+        metrics.add(kind, time.perf_counter() - started)
+
+
+def count(kind, number=1):
+    metrics = current()
+    if metrics is not None:
+        with metrics.lock:
+            metrics.counts[kind] += number
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    with timed('sql'):
+        return execute(sql, params, many, context)
+
+
+class Histograms:
+    """Гистограммы длительности запросов по именам URL в памяти процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def observe(self, view, metrics):
+        buckets = settings.METRICS_BUCKETS_MS
+        total_ms = metrics.elapsed() * 1000
+        with self.lock:
+            row = self.views.setdefault(view, {
+                'buckets': [0] * len(buckets),
+                'count': 0,
+                'sum_ms': 0.0,
+                'sql_ms': 0.0,
+                'sql_count': 0,
+            })
+            for index, bound in enumerate(buckets):
+                if total_ms <= bound:
+                    row['buckets'][index] += 1
+            row['count'] += 1
+            row['sum_ms'] += total_ms
+            row['sql_ms'] += metrics.durations['sql'] * 1000
+            row['sql_count'] += metrics.counts['sql']
+
+    def render(self):
+        """Текст в формате Prometheus exposition."""
+        buckets = settings.METRICS_BUCKETS_MS
+        lines = [
+            '# TYPE yatube_request_duration_seconds histogram',
+            '# TYPE yatube_sql_seconds_total counter',
+            '# TYPE yatube_sql_queries_total counter',
+        ]
+        with self.lock:
+            for view, row in sorted(self.views.items()):
+                label = f'view="{view}"'
+                for bound, number in zip(buckets, row['buckets']):
+                    lines.append(
+                        'yatube_request_duration_seconds_bucket'
+                        f'{{{label},le="{bound / 1000}"}} {number}'
+                    )
+                lines += [
+                    'yatube_request_duration_seconds_bucket'
+                    f'{{{label},le="+Inf"}} {row["count"]}',
+                    f'yatube_request_duration_seconds_count{{{label}}} '
+                    f'{row["count"]}',
+                    f'yatube_request_duration_seconds_sum{{{label}}} '
+                    f'{row["sum_ms"] / 1000:.6f}',
+                    f'yatube_sql_seconds_total{{{label}}} '
+                    f'{row["sql_ms"] / 1000:.6f}',
+                    f'yatube_sql_queries_total{{{label}}} {row["sql_count"]}',
+                ]
+        return '\n'.join(lines) + '\n'
+
+
+histograms = Histograms()
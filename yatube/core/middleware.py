@@ -0,0 +1,95 @@
+import json
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from core import metrics
+from core.routers import (
+    PIN_COOKIE,
+    RoutingState,
+    _state,
+    choose_replica,
+    logger,
+)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+perf_logger = logging.getLogger('yatube.perf')
+
+
+class PerformanceMiddleware:
+    """Замерить SQL, шаблоны, кеш и миниатюры для каждого запроса.
+
+    Итог пишется в заголовок Server-Timing, в лог yatube.perf одной
+    JSON-строкой и в гистограммы, которые отдает /metrics/.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with metrics.collect() as collected, ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(metrics.sql_wrapper)
+                )
+            response = self.get_response(request)
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        response['Server-Timing'] = collected.server_timing()
+        metrics.histograms.observe(view, collected)
+        perf_logger.info(json.dumps({
+            'view': view,
+            'method': request.method,
+            'status': response.status_code,
+            **collected.as_dict(),
+        }))
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Отправить чтение страниц из REPLICA_VIEWS на реплику.
+
+    После любой записи ответ ставит cookie на REPLICA_PIN_SECONDS,
+    и пока она жива, все чтения пользователя идут в основную базу.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        name = request.resolver_match.view_name
+        if name not in settings.REPLICA_VIEWS:
+            reason = 'view пишет в базу'
+        elif request.method not in SAFE_METHODS:
+            reason = f'метод {request.method}'
+        elif PIN_COOKIE in request.COOKIES:
+            reason = 'недавняя запись'
+        else:
+            alias = choose_replica()
+            if alias is not None:
+                _state.get().read_alias = alias
+                logger.debug('%s -> %s', name, alias)
+                return None
+            reason = 'реплики не настроены'
+        logger.debug('%s -> default (%s)', name, reason)
+        return None
@@ -0,0 +1,66 @@
+"""Одновременное выполнение независимых запросов страницы.
+
+fetch() запускает функции в общем ограниченном пуле потоков: каждая
+функция работает со своим соединением потока, поэтому задержки сети до
+базы складываются не последовательно, а перекрываются. SQLite в режиме
+WAL читает параллельно, ATOMIC_REQUESTS не включен.
+
+Внутри транзакции (атомарный блок, тест на TestCase) функции выполняются
+по очереди в текущем потоке: другие соединения не видят ее незакоммиченных
+данных. Маршрутизация чтения и замеры запроса передаются в потоки пула
+через копию контекста.
+"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+_executor = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                settings.FETCH_THREADS, thread_name_prefix='fetch'
+            )
+    return _executor
+
+
+def _in_transaction():
+    return any(connection.in_atomic_block for connection in connections.all())
+
+
+def _call(function):
+    try:
+        return function()
+    finally:
+        # request_finished до потоков пула не доходит: сломанные и
+        # устаревшие по CONN_MAX_AGE соединения закрываются здесь. При
+        # CONN_MAX_AGE = 0 поток держит соединение, а не открывает новое
+        # на каждую функцию: соединений не больше FETCH_THREADS на базу.
+        for connection in connections.all():
+            if connection.settings_dict['CONN_MAX_AGE'] or (
+                connection.errors_occurred
+            ):
+                connection.close_if_unusable_or_obsolete()
+
+
+def fetch(*functions):
+    """Выполнить functions одновременно, вернуть список их результатов.
+
+    Исключение функции (например, Http404) поднимается в вызывающем
+    потоке после того, как завершились все функции.
+    """
+    if settings.FETCH_THREADS < 2 or len(functions) < 2 or _in_transaction():
+        return [function() for function in functions]
+    executor = _get_executor()
+    futures = [
+        executor.submit(contextvars.copy_context().run, _call, function)
+        for function in functions
+    ]
+    return [future.result() for future in futures]
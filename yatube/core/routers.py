@@ -0,0 +1,52 @@
+"""Маршрутизация чтения на реплики с read-your-writes.
+
+ReplicaRoutingMiddleware решает для каждого запроса, можно ли читать
+с реплики, и кладет решение в RoutingState. ReplicaRouter только
+исполняет это решение и отмечает, что запрос что-то записал.
+"""
+import contextvars
+import logging
+import random
+
+from django.conf import settings
+
+logger = logging.getLogger('yatube.db')
+
+PIN_COOKIE = 'pin_primary'
+
+_state = contextvars.ContextVar('db_routing_state', default=None)
+
+
+class RoutingState:
+    def __init__(self):
+        self.read_alias = None
+        self.wrote = False
+
+
+def current_state():
+    return _state.get()
+
+
+def choose_replica():
+    replicas = settings.DATABASE_REPLICAS
+    return random.choice(replicas) if replicas else None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = current_state()
+        if state is not None and state.read_alias:
+            return state.read_alias
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        state = current_state()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
@@ -0,0 +1,67 @@
+import os
+
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates, Template
+
+from core.metrics import timed
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt', '.xml')
+
+
+class InstrumentedTemplate(Template):
+    """Шаблон, время рендеринга которого попадает в замеры запроса."""
+
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return super().render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        template = super().from_string(template_code)
+        return InstrumentedTemplate(template.template, self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
+
+
+def _loader_dirs(loader):
+    # cached.Loader в Django 2.2 не отдает get_dirs дочерних загрузчиков.
+    for child in getattr(loader, 'loaders', ()):
+        yield from _loader_dirs(child)
+    if hasattr(loader, 'get_dirs'):
+        yield from loader.get_dirs()
+
+
+def template_names(engine):
+    """Имена всех шаблонов из каталогов загрузчиков движка."""
+    names = set()
+    for loader in engine.template_loaders:
+        for directory in _loader_dirs(loader):
+            for root, _, files in os.walk(directory):
+                names.update(
+                    os.path.relpath(os.path.join(root, filename), directory)
+                    .replace(os.sep, '/')
+                    for filename in files
+                    if filename.endswith(TEMPLATE_EXTENSIONS)
+                )
+    return sorted(names)
+
+
+def compile_templates():
+    """Скомпилировать все шаблоны, вернуть {имя: ошибка} для сломанных.
+
+    С cached-загрузчиком скомпилированные шаблоны остаются в памяти
+    процесса, поэтому вызов при старте воркера прогревает кеш.
+    """
+    errors = {}
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for name in template_names(backend.engine):
+            try:
+                backend.engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError) as error:
+                errors[name] = error
+    return errors
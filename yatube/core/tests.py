@@ -1,4 +1,38 @@
-from django.test import TestCase
+import asyncio
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections, router, transaction
+from django.http import Http404, HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+from core.asgi import AsgiHandler, build_environ
+from core.checks import check_performance_settings, check_templates_compile
+from core import metrics, parallel
+from core.metrics import histograms
+from core.middleware import ReplicaRoutingMiddleware
+from core.routers import PIN_COOKIE, RoutingState, _state, current_state
+from posts import cache as feed_cache
+from posts.models import Follow, Post
+from yatube.settings.base import cache_config
+
+User = get_user_model()
 
 
 class ViewTestClass(TestCase):
@@ -6,3 +40,363 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         # Проверьте, что статус ответа сервера - 404
         # Проверьте, что используется шаблон core/404.html
+
+
+@override_settings(DATABASE_REPLICAS=['replica0'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def route(self, url, method='get', cookies=None, write=False):
+        """Пропустить запрос через middleware, вернуть (чтение, ответ)."""
+        request = getattr(RequestFactory(), method)(url)
+        request.COOKIES.update(cookies or {})
+        request.resolver_match = resolve(url)
+        seen = {}
+
+        def get_response(request):
+            middleware.process_view(request, None, (), {})
+            seen['read'] = router.db_for_read(Post)
+            if write:
+                router.db_for_write(Post)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        response = middleware(request)
+        return seen['read'], response
+
+    def test_read_views_use_replica(self):
+        read, response = self.route('/')
+        self.assertEqual(read, 'replica0')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_write_pins_to_primary(self):
+        read, response = self.route('/create/', method='post', write=True)
+        self.assertEqual(read, 'default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+        read, _ = self.route('/', cookies={PIN_COOKIE: '1'})
+        self.assertEqual(read, 'default')
+
+    def test_outside_request_uses_primary(self):
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_recent_change_reads_primary(self):
+        """Страница для только что измененной области строится с primary."""
+        cache.clear()
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            state.read_alias = 'replica0'
+            feed_cache.bump('index')
+            feed_cache.read_fresh(['index'])
+            self.assertIsNone(state.read_alias)
+            state.read_alias = 'replica0'
+            cache.set(
+                feed_cache.MODIFIED_KEY.format('index'),
+                time.time() - settings.REPLICA_PIN_SECONDS - 1,
+            )
+            feed_cache.read_fresh(['index'])
+            self.assertEqual(state.read_alias, 'replica0')
+        finally:
+            _state.reset(token)
+
+
+@skipUnless(
+    'replica0' in settings.DATABASES,
+    'реплика задается через YATUBE_DB_REPLICAS',
+)
+class ReplicaDatabaseTests(TransactionTestCase):
+    databases = {'default', 'replica0'}
+
+    def setUp(self):
+        cache.clear()
+        # Главная давно не менялась: реплика успела ее догнать.
+        cache.set(
+            feed_cache.MODIFIED_KEY.format('index'),
+            time.time() - settings.REPLICA_PIN_SECONDS - 1,
+        )
+
+    def test_reads_hit_replica_until_write(self):
+        user = User.objects.create_user(username='Writer')
+        self.client.force_login(user)
+        with CaptureQueriesContext(connections['replica0']) as replica:
+            self.client.get('/')
+        self.assertTrue(replica.captured_queries)
+        response = self.client.post('/create/', {'text': 'Текст'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+        with CaptureQueriesContext(connections['replica0']) as replica:
+            self.client.get('/profile/Writer/')
+        self.assertFalse(replica.captured_queries)
+
+    def test_guest_after_write_is_not_cached_from_replica(self):
+        """Гость сразу после чужой записи получает страницу с primary."""
+        user = User.objects.create_user(username='Writer')
+        self.client.force_login(user)
+        self.client.post('/create/', {'text': 'Текст'})
+        guest = self.client_class()
+        with CaptureQueriesContext(connections['replica0']) as replica:
+            response = guest.get('/')
+        self.assertFalse(replica.captured_queries)
+        self.assertContains(response, 'Текст')
+
+
+class ParallelFetchTests(TransactionTestCase):
+    def test_functions_run_concurrently_with_request_context(self):
+        """Функции идут в потоках пула и видят маршрутизацию запроса."""
+        barrier = threading.Barrier(2, timeout=5)
+        state = RoutingState()
+        token = _state.set(state)
+
+        def probe():
+            barrier.wait()
+            return threading.current_thread().name, current_state()
+
+        try:
+            results = parallel.fetch(probe, probe)
+        finally:
+            _state.reset(token)
+        names = {name for name, _ in results}
+        self.assertEqual(len(names), 2)
+        self.assertTrue(all(name.startswith('fetch') for name in names))
+        self.assertEqual([seen for _, seen in results], [state, state])
+
+    def test_errors_are_raised_in_caller(self):
+        def missing():
+            raise Http404
+
+        with self.assertRaises(Http404):
+            parallel.fetch(missing, lambda: None)
+
+    def test_transaction_runs_in_current_thread(self):
+        """Чужие соединения не видят незакоммиченных данных транзакции."""
+        with transaction.atomic():
+            User.objects.create_user(username='Uncommitted')
+            names = parallel.fetch(
+                lambda: threading.current_thread().name,
+                lambda: User.objects.filter(username='Uncommitted').exists(),
+            )
+        self.assertEqual(names, [threading.current_thread().name, True])
+
+    def test_profile_reads_concurrently(self):
+        author = User.objects.create_user(username='Parallel')
+        reader = User.objects.create_user(username='Reader')
+        Post.objects.create(author=author, text='Параллельный пост')
+        Follow.objects.create(user=reader, author=author)
+        self.client.force_login(reader)
+        response = self.client.get('/profile/Parallel/')
+        self.assertEqual(response.context['author'], author)
+        self.assertTrue(response.context['following'])
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            ['Параллельный пост'],
+        )
+
+
+class PerformanceMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Timed')
+        Post.objects.create(author=cls.user, text='Замеренный пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_header(self):
+        """Ответ несет замеры SQL, шаблонов, кеша и общее время."""
+        with self.assertLogs('yatube.perf', 'INFO') as logs:
+            response = self.client.get('/profile/Timed/')
+        timing = response['Server-Timing']
+        for part in ('sql;dur=', 'template;dur=', 'cache;desc=', 'total;'):
+            with self.subTest(part=part):
+                self.assertIn(part, timing)
+        self.assertIn('"view": "posts:profile"', logs.output[0])
+
+    def test_nested_templates_are_timed_once(self):
+        """Карточки внутри страницы не удваивают время шаблонов."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {number}')
+            for number in range(10)
+        )
+        response = self.client.get('/')
+        durations = {
+            part.split(';')[0].strip(): float(
+                part.split('dur=')[1].split(';')[0]
+            )
+            for part in response['Server-Timing'].split(',')
+            if 'dur=' in part
+        }
+        self.assertLessEqual(durations['template'], durations['total'])
+        with metrics.collect() as collected:
+            with metrics.timed('template'):
+                with metrics.timed('template'):
+                    pass
+        self.assertEqual(collected.counts['template'], 1)
+
+    def test_metrics_endpoint(self):
+        """Гистограммы по имени URL доступны на /metrics/ локально."""
+        self.client.get('/profile/Timed/')
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:profile"}',
+            response.content.decode(),
+        )
+        self.assertEqual(histograms.render(), histograms.render())
+
+    def test_metrics_endpoint_is_local(self):
+        response = self.client.get('/metrics/', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 403)
+
+
+class TemplateWarmUpTests(SimpleTestCase):
+    def test_project_templates_compile(self):
+        self.assertEqual(check_templates_compile(None), [])
+
+    def test_broken_template_is_reported(self):
+        with tempfile.TemporaryDirectory() as directory:
+            Path(directory, 'broken.html').write_text('{% if %}')
+            Path(directory, 'fine.html').write_text('{{ value }}')
+            templates = [{
+                'BACKEND': settings.TEMPLATES[0]['BACKEND'],
+                'DIRS': [directory],
+            }]
+            with self.settings(TEMPLATES=templates):
+                errors = check_templates_compile(None)
+        self.assertEqual(len(errors), 1)
+        self.assertIn('broken.html', errors[0].msg)
+
+
+class PerformanceSettingsTests(SimpleTestCase):
+    LOCMEM = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+
+    def ids(self):
+        return [message.id for message in check_performance_settings(None)]
+
+    def test_dev_profile_is_not_checked(self):
+        with self.settings(ENVIRONMENT='dev', CACHES=self.LOCMEM):
+            self.assertEqual(self.ids(), [])
+
+    def test_slow_production_settings_warn(self):
+        with self.settings(
+            ENVIRONMENT='prod', CACHES=self.LOCMEM, SQLITE_PRAGMAS={}
+        ):
+            self.assertEqual(self.ids(), ['core.W001', 'core.W003'])
+
+    def test_missing_cache_client_falls_back_to_file_in_dev(self):
+        with patch('importlib.util.find_spec', return_value=None):
+            config = cache_config('redis', stand_in=True)
+        self.assertIn('FileBasedCache', config['default']['BACKEND'])
+
+    def test_missing_cache_client_is_reported_in_prod(self):
+        with patch('importlib.util.find_spec', return_value=None):
+            caches = cache_config('redis')
+            with self.settings(ENVIRONMENT='prod', CACHES=caches):
+                self.assertIn('core.E002', self.ids())
+
+    def test_file_cache_warns_about_versions(self):
+        with self.settings(ENVIRONMENT='prod', CACHES=cache_config('file')):
+            self.assertIn('core.W005', self.ids())
+
+
+class SqlitePragmasTests(TestCase):
+    def test_pragmas_applied_to_new_connections(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(
+                cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout']
+            )
+
+
+class AsgiHandlerTests(SimpleTestCase):
+    def call(self, application, scope, messages):
+        handler = AsgiHandler(application, 2)
+        received = list(messages)
+        sent = []
+
+        async def receive():
+            return received.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(handler(scope, receive, send))
+        handler.executor.shutdown()
+        return sent
+
+    def test_django_page(self):
+        sent = self.call(
+            get_wsgi_application(),
+            {'type': 'http', 'method': 'GET', 'path': '/about/author/',
+             'headers': [(b'host', b'localhost')]},
+            [{'type': 'http.request', 'body': b''}],
+        )
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn(b'server-timing', dict(sent[0]['headers']))
+        self.assertTrue(b''.join(message.get('body', b'')
+                                 for message in sent[1:]))
+        self.assertFalse(sent[-1].get('more_body'))
+
+    def test_response_is_sent_after_thread_is_released(self):
+        """Медленный клиент не держит поток пула на обычном ответе."""
+        handler = AsgiHandler(get_wsgi_application(), 1)
+        free = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            if message['type'] == 'http.response.body':
+                probe = asyncio.get_running_loop().run_in_executor(
+                    handler.executor, lambda: True
+                )
+                free.append(await asyncio.wait_for(probe, 1))
+
+        scope = {'type': 'http', 'method': 'GET', 'path': '/about/author/',
+                 'headers': [(b'host', b'localhost')]}
+        try:
+            asyncio.run(handler(scope, receive, send))
+        finally:
+            handler.executor.shutdown(wait=False)
+        self.assertEqual(free, [True])
+
+    def test_body_and_streaming(self):
+        """Тело запроса собирается из частей, ответ уходит частями."""
+        def application(environ, start_response):
+            body = environ['wsgi.input'].read()
+            start_response('201 Created', [('X-Length', str(len(body)))])
+            return iter([environ['HTTP_X_NAME'].encode(), body])
+
+        sent = self.call(
+            application,
+            {'type': 'http', 'method': 'POST', 'path': '/',
+             'headers': [(b'x-name', b'a'), (b'x-name', b'b')]},
+            [{'type': 'http.request', 'body': b'12', 'more_body': True},
+             {'type': 'http.request', 'body': b'34'}],
+        )
+        self.assertEqual(sent[0]['status'], 201)
+        self.assertEqual(sent[0]['headers'], [(b'x-length', b'4')])
+        self.assertEqual(
+            [message['body'] for message in sent[1:]], [b'a,b', b'1234', b'']
+        )
+
+    def test_lifespan(self):
+        sent = self.call(
+            None, {'type': 'lifespan'},
+            [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}],
+        )
+        self.assertEqual(
+            [message['type'] for message in sent],
+            ['lifespan.startup.complete', 'lifespan.shutdown.complete'],
+        )
+
+    def test_environ_path_and_query(self):
+        environ = build_environ(
+            {'method': 'GET', 'path': '/группа/', 'query_string': b'q=1'},
+            None,
+        )
+        self.assertEqual(
+            environ['PATH_INFO'].encode('latin-1').decode(), '/группа/'
+        )
+        self.assertEqual(environ['QUERY_STRING'], 'q=1')
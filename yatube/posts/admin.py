@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.contrib import admin
 
 from posts.models import Group, Post
+from posts.search import get_backend as search_backend
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -16,6 +18,14 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Вместо LIKE '%...%' берем лучшие по рангу id из поискового индекса.
+        if not search_term:
+            return queryset, False
+        found = search_backend().search(search_term)
+        ids = [post.pk for post in found[:settings.SEARCH_ADMIN_LIMIT]]
+        return queryset.filter(pk__in=ids), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
@@ -0,0 +1,163 @@
+"""Read-only JSON API лент для мобильных клиентов.
+
+Страницы отдаются с курсорной пагинацией (?cursor=) и разреженными
+наборами полей (?fields=id,text). ETag и Last-Modified считаются по
+версиям областей кеша из posts.cache, поэтому повторный запрос с
+If-None-Match или If-Modified-Since получает 304 до обращения к базе.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
+
+from posts import timeline
+from posts.cache import conditional_feed
+from posts.models import AuthorStats, Comment, Group, Post, User
+from posts.pagination import CursorPaginator, InvalidCursor
+
+# Имя поля в ответе -> поле для values().
+POST_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+
+
+class ApiError(Exception):
+    pass
+
+
+def api_view(scopes):
+    """GET-view API с условными ответами по версиям областей scopes."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                return view(request, *args, **kwargs)
+            except ApiError as error:
+                return JsonResponse({'error': str(error)}, status=400)
+        return require_GET(conditional_feed(scopes)(wrapper))
+    return decorator
+
+
+def requested_fields(request, available):
+    names = request.GET.get('fields')
+    if not names:
+        return list(available)
+    names = names.split(',')
+    unknown = sorted(set(names) - set(available))
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(unknown)}')
+    return names
+
+
+def serialize(row, names, field_map):
+    item = {name: row[field_map[name]] for name in names}
+    if item.get('image') is not None:
+        storage = Post._meta.get_field('image').storage
+        item['image'] = storage.url(item['image']) if item['image'] else None
+    return item
+
+
+def _link(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def paginate(request, queryset, field_map, key_field='pub_date',
+             pk_field='pk'):
+    """Страница values()-строк queryset с полями из ?fields=."""
+    names = requested_fields(request, field_map)
+    lookups = {field_map[name] for name in names} | {key_field, pk_field}
+    paginator = CursorPaginator(
+        queryset.values(*lookups), settings.API_PAGE_SIZE,
+        key_field=key_field, pk_field=pk_field,
+    )
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor as error:
+        raise ApiError(str(error))
+    return {
+        'results': [serialize(row, names, field_map) for row in page],
+        'next': _link(request, page.next_cursor),
+        'previous': _link(request, page.previous_cursor),
+    }
+
+
+@api_view(lambda request: ['index'])
+def posts(request):
+    return JsonResponse(paginate(request, Post.objects.all(), POST_FIELDS))
+
+
+@api_view(lambda request, slug: [f'group:{slug}'])
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    data = paginate(request, group.posts.all(), POST_FIELDS)
+    data['group'] = {
+        'slug': group.slug,
+        'title': group.title,
+        'description': group.description,
+    }
+    return JsonResponse(data)
+
+
+@api_view(lambda request, username: [f'author:{username}'])
+def profile_posts(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    data = paginate(request, author.posts.all(), POST_FIELDS)
+    # Строки счетчиков может еще не быть (bulk_create до reconcile_counters).
+    stats = getattr(author, 'stats', None) or AuthorStats()
+    data['author'] = {
+        'username': author.username,
+        'posts_count': stats.posts_count,
+        'followers_count': stats.followers_count,
+        'following_count': stats.following_count,
+    }
+    return JsonResponse(data)
+
+
+@api_view(lambda request, post_id: [f'post:{post_id}'])
+def post_detail(request, post_id):
+    names = requested_fields(request, POST_FIELDS)
+    row = Post.objects.filter(pk=post_id).values(
+        *{POST_FIELDS[name] for name in names}
+    ).first()
+    if row is None:
+        raise Http404('Пост не найден')
+    return JsonResponse(serialize(row, names, POST_FIELDS))
+
+
+@api_view(lambda request, post_id: [f'comments:{post_id}'])
+def post_comments(request, post_id):
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = Comment.objects.filter(post_id=post_id)
+    return JsonResponse(
+        paginate(request, comments, COMMENT_FIELDS, key_field='created')
+    )
+
+
+@api_view(lambda request: ['index', f'follow:{request.user.pk}'])
+def feed(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Нужна авторизация'}, status=401)
+    return JsonResponse(paginate(
+        request, timeline.feed(request.user), POST_FIELDS,
+        key_field='feed_date', pk_field='feed_pk',
+    ))
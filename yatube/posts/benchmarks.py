@@ -0,0 +1,187 @@
+"""Общие помощники для management-команд benchmark и bench_*.
+
+Все данные создаются внутри транзакции, которая откатывается
+в конце замера, поэтому рабочая база не засоряется. Кеш на время замера
+подменяется локальным в памяти процесса: cache.clear() и страницы из
+откатываемых данных не должны попадать в общий кеш воркеров.
+"""
+import contextlib
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from faker import Faker
+from mixer.backend.django import mixer
+
+from posts import counters, timeline
+from posts.importers import explicit_pub_date
+from posts.models import Comment, Follow, Group, Post, User
+from posts.search import get_backend as search_backend
+
+
+PRIVATE_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'yatube-benchmark',
+    },
+}
+
+
+@contextlib.contextmanager
+def rollback():
+    with override_settings(CACHES=PRIVATE_CACHES), transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def seed_posts(author, count, group=None, batch_size=5000, text=None):
+    """Создать count постов с убывающими pub_date через bulk_create.
+
+    text(number) возвращает текст поста, по умолчанию 'Пост номер N'.
+    """
+    text = text or 'Пост номер {}'.format
+    start = timezone.now()
+    with explicit_pub_date():
+        for offset in range(0, count, batch_size):
+            Post.objects.bulk_create(
+                Post(
+                    text=text(number),
+                    author=author,
+                    group=group,
+                    pub_date=start - timedelta(seconds=number),
+                )
+                for number in range(offset, min(count, offset + batch_size))
+            )
+
+
+def measure(func, repeat=5):
+    """Медиана времени вызова func в миллисекундах."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def percentile(samples, share):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(share * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def profile_call(func, repeat):
+    """Задержки (p50/p90/p99), число запросов и пик памяти вызова func."""
+    samples = []
+    queries = []
+    peaks = []
+    for _ in range(repeat):
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+        queries.append(len(captured.captured_queries))
+    return {
+        'p50_ms': round(percentile(samples, 0.5), 3),
+        'p90_ms': round(percentile(samples, 0.9), 3),
+        'p99_ms': round(percentile(samples, 0.99), 3),
+        'queries': max(queries),
+        'peak_kb': round(max(peaks), 1),
+    }
+
+
+class Dataset:
+    """Реалистичный набор данных для замеров.
+
+    Небольшие таблицы заполняет mixer, массовые — bulk_create с текстами
+    из заранее сгенерированного Faker пула. bulk_create не шлет сигналы,
+    поэтому счетчики, поиск и ленты пересобираются в конце.
+    """
+
+    def __init__(self, users, groups, posts, follows, comments, seed=0):
+        self.sizes = {
+            'users': users,
+            'groups': groups,
+            'posts': posts,
+            'follows_per_user': follows,
+            'comments': comments,
+        }
+        self.random = random.Random(seed)
+        fake = Faker('ru_RU')
+        fake.seed_instance(seed)
+        self.texts = [fake.paragraph() for _ in range(500)]
+
+    def build(self):
+        sizes = self.sizes
+        User.objects.bulk_create(
+            User(username=f'bench_user_{number}')
+            for number in range(sizes['users'])
+        )
+        self.users = list(
+            User.objects.filter(username__startswith='bench_user_')
+            .values_list('pk', flat=True)
+        )
+        self.groups = mixer.cycle(sizes['groups']).blend(Group)
+        self.reader = User.objects.get(pk=self.users[0])
+        self.author = User.objects.get(pk=self.users[-1])
+        last_pk = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+        self._seed_posts()
+        self.post_ids = (last_pk + 1, last_pk + sizes['posts'])
+        self.post = Post.objects.create(
+            author=self.author, text=self.texts[0]
+        )
+        self._seed_follows()
+        self._seed_comments()
+        counters.reconcile()
+        search_backend().rebuild()
+        timeline.rebuild(self.reader)
+        return self
+
+    def _seed_posts(self, batch_size=5000):
+        start = timezone.now()
+        choice = self.random.choice
+        with explicit_pub_date():
+            for offset in range(0, self.sizes['posts'], batch_size):
+                stop = min(self.sizes['posts'], offset + batch_size)
+                Post.objects.bulk_create(
+                    Post(
+                        text=choice(self.texts),
+                        author_id=choice(self.users),
+                        group=choice(self.groups + [None]),
+                        pub_date=start - timedelta(seconds=number),
+                    )
+                    for number in range(offset, stop)
+                )
+
+    def _seed_follows(self):
+        count = min(self.sizes['follows_per_user'], len(self.users) - 1)
+        follows = []
+        for user in self.users:
+            for author in self.random.sample(self.users, count + 1):
+                if author != user:
+                    follows.append(Follow(user_id=user, author_id=author))
+        follows.append(Follow(user=self.reader, author=self.author))
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+
+    def _seed_comments(self):
+        first, last = self.post_ids
+        randint = self.random.randint
+        comments = (
+            Comment(
+                post_id=self.post.pk if number % 10 == 0
+                else randint(first, last),
+                author_id=self.random.choice(self.users),
+                text=self.random.choice(self.texts),
+            )
+            for number in range(self.sizes['comments'])
+        )
+        Comment.objects.bulk_create(comments)
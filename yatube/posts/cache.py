@@ -0,0 +1,265 @@
+"""Кеш страниц лент с версионными ключами.
+
+Каждая страница зависит от набора областей (scope): 'index',
+'group:<slug>', 'author:<username>', 'follow:<user_id>', 'post:<id>',
+'comments:<post_id>', 'groups' (каталог групп),
+'trending' (лента популярного).
+Сигналы моделей увеличивают версию затронутых областей, и ключи
+старых страниц просто перестают использоваться.
+
+Версия растет сразу после записи в основную базу, а реплика может еще
+отставать. Поэтому страницы и фрагменты, которые строятся заново для
+областей, измененных менее REPLICA_PIN_SECONDS назад, читаются из
+основной базы (read_fresh): иначе устаревшая страница с реплики попала
+бы в кеш и получила ETag под новой версией.
+"""
+import hashlib
+import logging
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from core import metrics
+from core.routers import current_state
+
+logger = logging.getLogger('yatube.db')
+
+VERSION_KEY = 'feed:version:{}'
+MODIFIED_KEY = 'feed:modified:{}'
+STATS_KEY = 'feed:stats:{}:{}'
+
+
+def get_versions(scopes):
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Новая версия не должна совпасть с вытесненной старой.
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(*scopes):
+    now = time.time()
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+    cache.set_many(
+        {MODIFIED_KEY.format(scope): now for scope in scopes}, None
+    )
+
+
+def modified_at(scopes):
+    """Unix-время последнего изменения областей scopes.
+
+    Если отметка вытеснена из кеша, изменением считается текущий момент:
+    лишний полный ответ безопаснее, чем ложный 304.
+    """
+    keys = [MODIFIED_KEY.format(scope) for scope in scopes]
+    stamps = cache.get_many(keys)
+    now = time.time()
+    for key in keys:
+        if key not in stamps:
+            cache.add(key, now, None)
+            stamps[key] = cache.get(key, now)
+    return max(stamps.values())
+
+
+def last_modified(scopes):
+    """Время последнего изменения областей scopes (для Last-Modified)."""
+    return datetime.fromtimestamp(modified_at(scopes), timezone.utc)
+
+
+def read_fresh(scopes):
+    """Читать из основной базы, если реплика может не видеть scopes.
+
+    Окно отставания реплики то же, что у cookie read-your-writes.
+    """
+    state = current_state()
+    if state is None or not state.read_alias:
+        return
+    if time.time() - modified_at(scopes) < settings.REPLICA_PIN_SECONDS:
+        logger.debug('%s -> default (недавнее изменение)', scopes)
+        state.read_alias = None
+
+
+def _count(name, outcome, number=1):
+    key = STATS_KEY.format(name, outcome)
+    if not cache.add(key, number, None):
+        try:
+            cache.incr(key, number)
+        except ValueError:
+            cache.add(key, number, None)
+
+
+def stats(names):
+    """Счетчики попаданий и промахов: {name: {'hit': n, 'miss': n}}."""
+    return {
+        name: {
+            outcome: cache.get(STATS_KEY.format(name, outcome), 0)
+            for outcome in ('hit', 'miss')
+        }
+        for name in names
+    }
+
+
+def page_key(name, request, scopes):
+    user = request.user.pk if request.user.is_authenticated else 'anon'
+    versions = '.'.join(str(version) for version in get_versions(scopes))
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'feed:page:{name}:{user}:{versions}:{path}'
+
+
+def fragment_key(name, versions, parts):
+    versions = '.'.join(str(version) for version in versions)
+    raw = '|'.join(str(part) for part in parts)
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return f'feed:fragment:{name}:{versions}:{digest}'
+
+
+def cached_fragment(name, scopes, parts, build):
+    """Вернуть закешированный фрагмент или построить его через build().
+
+    Ключ зависит от версий областей scopes и значений parts (например,
+    пост и курсор страницы); время жизни — FEED_CACHE_TTL[name].
+    """
+    key = fragment_key(name, get_versions(scopes), parts)
+    fragment = cache.get(key)
+    if fragment is not None:
+        _count(name, 'hit')
+        metrics.count('cache_hit')
+        return fragment
+    _count(name, 'miss')
+    metrics.count('cache_miss')
+    read_fresh(scopes)
+    fragment = build()
+    cache.set(key, fragment, settings.FEED_CACHE_TTL[name])
+    return fragment
+
+
+def cached_fragments(name, objects, scopes, parts, build):
+    """cached_fragment для списка objects за несколько обращений к кешу.
+
+    scopes(obj), parts(obj) и build(obj) вызываются для каждого объекта;
+    версии и фрагменты читаются одним get_many, промахи пишутся set_many.
+    """
+    scope_lists = [scopes(obj) for obj in objects]
+    names = list({scope for scope_list in scope_lists for scope in scope_list})
+    versions = dict(zip(names, get_versions(names)))
+    keys = [
+        fragment_key(
+            name, [versions[scope] for scope in scope_list], parts(obj)
+        )
+        for obj, scope_list in zip(objects, scope_lists)
+    ]
+    found = cache.get_many(keys)
+    if len(found) < len(keys):
+        read_fresh(names)
+    missing = {}
+    fragments = []
+    for obj, key in zip(objects, keys):
+        if key not in found:
+            missing[key] = found[key] = build(obj)
+        fragments.append(found[key])
+    hits = len(keys) - len(missing)
+    for outcome, number in (('hit', hits), ('miss', len(missing))):
+        if number:
+            _count(name, outcome, number)
+            metrics.count(f'cache_{outcome}', number)
+    if missing:
+        cache.set_many(missing, settings.FEED_CACHE_TTL[name])
+    return fragments
+
+
+def cache_feed(name, scopes, anonymous_only=False):
+    """Кешировать GET-ответ view по версиям областей scopes(request, ...).
+
+    Время жизни берется из FEED_CACHE_TTL[name]; anonymous_only для
+    страниц с формами, где в ответе есть CSRF-токен пользователя.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or (
+                anonymous_only and request.user.is_authenticated
+            ):
+                return view(request, *args, **kwargs)
+            page_scopes = scopes(request, *args, **kwargs)
+            key = page_key(name, request, page_scopes)
+            response = cache.get(key)
+            if response is not None:
+                _count(name, 'hit')
+                metrics.count('cache_hit')
+                return response
+            _count(name, 'miss')
+            metrics.count('cache_miss')
+            read_fresh(page_scopes)
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response, settings.FEED_CACHE_TTL[name])
+            return response
+        return wrapper
+    return decorator
+
+
+def scope_etag(scopes):
+    """etag_func для condition: путь, пользователь, версии и релиз."""
+    def etag(request, *args, **kwargs):
+        user = request.user.pk if request.user.is_authenticated else 'anon'
+        versions = get_versions(scopes(request, *args, **kwargs))
+        raw = (
+            f'{settings.RELEASE}|{request.get_full_path()}|{user}|{versions}'
+        )
+        return hashlib.md5(raw.encode()).hexdigest()
+    return etag
+
+
+def scope_last_modified(scopes):
+    def modified(request, *args, **kwargs):
+        return last_modified(scopes(request, *args, **kwargs))
+    return modified
+
+
+def conditional_feed(scopes, anonymous_only=False):
+    """Ответить 304 по версиям областей scopes до выполнения view.
+
+    Ответы всегда перепроверяются (no-cache): страницы гостей можно
+    хранить и в общих кешах, страницы пользователя — только в браузере.
+    Vary: Cookie не дает отдать одному пользователю страницу другого.
+    anonymous_only — как в cache_feed: в ответе пользователю CSRF-токен,
+    который меняется при входе, а в ETag он не попадает.
+    """
+    def decorator(view):
+        conditional = condition(
+            etag_func=scope_etag(scopes),
+            last_modified_func=scope_last_modified(scopes),
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if anonymous_only and request.user.is_authenticated:
+                response = view(request, *args, **kwargs)
+            else:
+                # ETag по новой версии не должен достаться странице,
+                # прочитанной с отстающей реплики.
+                read_fresh(scopes(request, *args, **kwargs))
+                response = conditional(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                private = request.user.is_authenticated
+                patch_cache_control(
+                    response, no_cache=True,
+                    private=private, public=not private,
+                )
+                patch_vary_headers(response, ['Cookie'])
+            return response
+        return wrapper
+    return decorator
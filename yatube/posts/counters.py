@@ -0,0 +1,77 @@
+"""Денормализованные счетчики постов, комментариев и подписок.
+
+Счетчики меняются атомарными UPDATE ... SET x = x + 1 из сигналов,
+а reconcile() пересчитывает их по исходным таблицам, если они
+разошлись (например, после bulk_create, который не шлет сигналы).
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import AuthorStats, Comment, Follow, Post, User
+
+
+def change_author_stats(user_id, **deltas):
+    values = {field: F(field) + delta for field, delta in deltas.items()}
+    if not AuthorStats.objects.filter(user_id=user_id).update(**values):
+        AuthorStats.objects.get_or_create(user_id=user_id)
+        AuthorStats.objects.filter(user_id=user_id).update(**values)
+
+
+def change_comments_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def _count_of(queryset, field):
+    counted = (
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counted), 0)
+
+
+AUTHOR_COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def _repair(queryset, field, expected):
+    drifted = queryset.annotate(expected=expected).exclude(
+        **{field: F('expected')}
+    )
+    count = drifted.count()
+    if count:
+        queryset.filter(pk__in=drifted.values('pk')).update(
+            **{field: expected}
+        )
+    return count
+
+
+def reconcile():
+    """Пересчитать все счетчики, вернуть число исправленных строк."""
+    users = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True
+    )
+    AuthorStats.objects.bulk_create(
+        (AuthorStats(user_id=pk) for pk in users.iterator()),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    fixed = {
+        field: _repair(
+            AuthorStats.objects.all(), field, _count_of(model.objects, column)
+        )
+        for field, (model, column) in AUTHOR_COUNTERS.items()
+    }
+    fixed['comments_count'] = _repair(
+        Post.objects.all(),
+        'comments_count',
+        _count_of(Comment.objects, 'post'),
+    )
+    return fixed
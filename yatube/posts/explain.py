@@ -0,0 +1,93 @@
+"""Проверка планов запросов, которые выполняют страницы.
+
+Запросы страницы перехватываются CaptureQueriesContext, затем для
+каждого SELECT выполняется EXPLAIN. Полный просмотр таблицы и сортировка
+во временной структуре считаются проблемой: ленты должны читаться по
+индексу в нужном порядке, сколько бы строк ни было в таблице.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+# Полный просмотр таблицы без индекса; SQLite до 3.36 пишет 'SCAN TABLE'.
+SQLITE_FULL_SCAN = re.compile(
+    r'\bSCAN (?:TABLE )?(\w+)(?! USING (?:COVERING )?INDEX)(?!\w)'
+)
+SQLITE_TEMP_SORT = 'USE TEMP B-TREE'
+# COUNT(*) Django над срезом: просмотр уже ограниченной выборки, план
+# самой выборки проверяется отдельными строками.
+SQLITE_DERIVED_TABLES = ('subquery',)
+POSTGRES_PROBLEMS = ('Seq Scan', 'Sort')
+
+
+def capture(client, url):
+    """Код ответа и SELECT-запросы, выполненные при GET url."""
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    return response.status_code, [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].lstrip().upper().startswith('SELECT')
+    ]
+
+
+def client_host():
+    """Хост из ALLOWED_HOSTS: на чужой хост страницы ответят 400."""
+    for host in settings.ALLOWED_HOSTS:
+        host = host.lstrip('.')
+        if host and host != '*':
+            return host
+    return 'testserver'
+
+
+def explain(sql):
+    """Строки плана запроса для текущей базы."""
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else (
+        'EXPLAIN '
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql)
+        return [' '.join(str(part) for part in row) for row in cursor]
+
+
+def problems(plan, allowed_tables=()):
+    """Проблемные шаги плана: полные просмотры и временные сортировки."""
+    found = []
+    for step in plan:
+        if connection.vendor == 'sqlite':
+            scan = SQLITE_FULL_SCAN.search(step)
+            if scan and scan.group(1) not in (
+                *allowed_tables, *SQLITE_DERIVED_TABLES
+            ):
+                found.append(step)
+            elif SQLITE_TEMP_SORT in step:
+                found.append(step)
+        elif any(problem in step for problem in POSTGRES_PROBLEMS):
+            found.append(step)
+    return found
+
+
+def check_views(urls, user=None, allowed_tables=()):
+    """{(имя, sql): [проблемные шаги]} для страниц urls {имя: адрес}.
+
+    Страница, которая ответила не 200 или не выполнила ни одного SELECT,
+    тоже попадает в отчет: проверять у нее нечего.
+    """
+    host = client_host()
+    client = Client(HTTP_HOST=host, SERVER_NAME=host)
+    if user is not None:
+        client.force_login(user)
+    report = {}
+    for name, url in urls.items():
+        status, queries = capture(client, url)
+        if status != 200:
+            report[(name, f'GET {url}')] = [f'Ответ {status}']
+        elif not queries:
+            report[(name, f'GET {url}')] = ['Нет ни одного SELECT']
+        for sql in queries:
+            found = problems(explain(sql), allowed_tables)
+            if found:
+                report[(name, sql)] = found
+    return report
@@ -0,0 +1,90 @@
+"""Потоковая выгрузка постов вместе с комментариями.
+
+Посты читаются .iterator(chunk_size=...) по первичному ключу, а
+комментарии подгружаются одним запросом на пачку постов, поэтому
+память не зависит от объема выгрузки, а первые байты уходят сразу.
+"""
+import csv
+import json
+from itertools import islice
+
+from posts.models import Comment
+
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+CSV_FIELDS = ('kind', 'id', 'post_id', 'author', 'group', 'date', 'text')
+
+
+class Echo:
+    """Файлоподобный объект для csv.writer: возвращает строку как есть."""
+
+    def write(self, value):
+        return value
+
+
+def threads(posts, chunk_size):
+    """Пары (пост, комментарии) пачками по chunk_size постов."""
+    posts = posts.select_related('author', 'group').order_by('pk')
+    rows = posts.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        comments = {post.pk: [] for post in chunk}
+        for comment in Comment.objects.filter(
+            post_id__in=comments
+        ).select_related('author').order_by('pk'):
+            comments[comment.post_id].append(comment)
+        for post in chunk:
+            yield post, comments[post.pk]
+
+
+def _post_dict(post):
+    return {
+        'id': post.pk,
+        'author': post.author.username,
+        'group': post.group.slug if post.group else None,
+        'date': post.pub_date.isoformat(),
+        'text': post.text,
+    }
+
+
+def _comment_dict(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'date': comment.created.isoformat(),
+        'text': comment.text,
+    }
+
+
+def export_jsonl(posts, chunk_size):
+    for post, comments in threads(posts, chunk_size):
+        record = _post_dict(post)
+        record['comments'] = [_comment_dict(item) for item in comments]
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def export_csv(posts, chunk_size):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_FIELDS)
+    for post, comments in threads(posts, chunk_size):
+        record = _post_dict(post)
+        yield writer.writerow((
+            'post', record['id'], record['id'], record['author'],
+            record['group'] or '', record['date'], record['text'],
+        ))
+        for comment in comments:
+            item = _comment_dict(comment)
+            yield writer.writerow((
+                'comment', item['id'], post.pk, item['author'],
+                '', item['date'], item['text'],
+            ))
+
+
+def export(posts, file_format, chunk_size):
+    exporter = export_csv if file_format == 'csv' else export_jsonl
+    return exporter(posts, chunk_size)
@@ -0,0 +1,63 @@
+"""Идемпотентные подписки и отписки одним запросом к базе.
+
+INSERT с игнорированием конфликта и прямой DELETE не требуют
+предварительной проверки exists(): гонка двух одинаковых запросов
+заканчивается одной строкой, а не IntegrityError. Сигналы Follow
+(счетчики, сброс кеша) отправляются вручную и только если строка
+действительно добавилась или удалилась.
+"""
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+
+from posts import timeline
+from posts.models import Follow
+
+
+def _insert_ignore(user, author):
+    ops = connection.ops
+    table = ops.quote_name(Follow._meta.db_table)
+    sql = (
+        f'{ops.insert_statement(ignore_conflicts=True)} {table} '
+        f'({ops.quote_name("user_id")}, {ops.quote_name("author_id")}) '
+        f'VALUES (%s, %s) {ops.ignore_conflicts_suffix_sql(True)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user.pk, author.pk])
+        return cursor.rowcount
+
+
+def follow(user, author):
+    """Подписать user на author; True, если подписки еще не было."""
+    if user.pk == author.pk:
+        return False
+    with transaction.atomic():
+        if not _insert_ignore(user, author):
+            return False
+        post_save.send(
+            Follow, instance=Follow(user=user, author=author), created=True,
+            update_fields=None, raw=False, using=connection.alias,
+        )
+    timeline.backfill(user, author)
+    return True
+
+
+def follow_many(user, authors):
+    """Подписать user на каждого из authors, вернуть новых авторов."""
+    with transaction.atomic():
+        return [author for author in authors if follow(user, author)]
+
+
+def unfollow(user, author):
+    """Отписать user от author; True, если подписка была."""
+    with transaction.atomic():
+        deleted = Follow.objects.filter(
+            user=user, author=author
+        )._raw_delete(connection.alias)
+        if not deleted:
+            return False
+        post_delete.send(
+            Follow, instance=Follow(user=user, author=author),
+            using=connection.alias,
+        )
+    timeline.purge(user, author)
+    return True
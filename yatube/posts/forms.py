@@ -1,6 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
-from posts.models import Comment, Post
+from posts import uploads
+from posts.models import Comment, Group, Post, User
 
 
 class PostForm(forms.ModelForm):
@@ -12,6 +14,12 @@ class PostForm(forms.ModelForm):
             'group': 'Группа в которой будет находится пост',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            return uploads.process(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -21,3 +29,27 @@ class CommentForm(forms.ModelForm):
         help_texts = {
             'text': 'Введите текст комментария'
         }
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Запрос', max_length=200)
+    group = forms.CharField(label='Группа (slug)', required=False)
+    author = forms.CharField(label='Автор', required=False)
+
+    def clean_group(self):
+        slug = self.cleaned_data['group']
+        if not slug:
+            return None
+        group = Group.objects.filter(slug=slug).first()
+        if group is None:
+            raise forms.ValidationError('Такой группы нет')
+        return group
+
+    def clean_author(self):
+        username = self.cleaned_data['author']
+        if not username:
+            return None
+        author = User.objects.filter(username=username).first()
+        if author is None:
+            raise forms.ValidationError('Такого автора нет')
+        return author
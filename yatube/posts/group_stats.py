@@ -0,0 +1,54 @@
+"""Статистика групп для каталога /group/.
+
+Каталог читает готовые строки GroupStats и GroupTopAuthor, поэтому его
+стоимость зависит только от числа групп. refresh() пересчитывает их
+двумя GROUP BY по постам и запускается периодически (cron) командой
+refresh_group_stats; между запусками числа могут немного отставать.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+
+from posts.cache import bump
+from posts.models import GroupStats, GroupTopAuthor, Post
+
+
+def _top_authors(posts, top):
+    rows = (
+        posts.values('group', 'author')
+        .annotate(posts_count=Count('pk'))
+        .order_by('group', '-posts_count', 'author')
+    )
+    taken = {}
+    for row in rows.iterator():
+        if taken.get(row['group'], 0) < top:
+            taken[row['group']] = taken.get(row['group'], 0) + 1
+            yield GroupTopAuthor(
+                group_id=row['group'],
+                author_id=row['author'],
+                posts_count=row['posts_count'],
+            )
+
+
+def refresh(top=None):
+    """Пересчитать статистику всех групп, вернуть число групп с постами."""
+    top = settings.GROUP_TOP_AUTHORS if top is None else top
+    posts = Post.objects.filter(group__isnull=False).order_by()
+    stats = [
+        GroupStats(
+            group_id=row['group'],
+            posts_count=row['posts_count'],
+            last_post_date=row['last_post_date'],
+        )
+        for row in posts.values('group').annotate(
+            posts_count=Count('pk'), last_post_date=Max('pub_date')
+        )
+    ]
+    authors = list(_top_authors(posts, top))
+    with transaction.atomic():
+        GroupStats.objects.all().delete()
+        GroupTopAuthor.objects.all().delete()
+        GroupStats.objects.bulk_create(stats, batch_size=1000)
+        GroupTopAuthor.objects.bulk_create(authors, batch_size=1000)
+    bump('groups')
+    return len(stats)
@@ -0,0 +1,108 @@
+"""Перенос картинок постов на имена по содержимому и сборка мусора.
+
+dedupe() переименовывает файлы, загруженные до ContentAddressedStorage,
+и сливает одинаковые: посты начинают ссылаться на общий файл.
+collect_garbage() удаляет файлы каталога картинок, на которые не
+ссылается ни один пост, вместе с их миниатюрами. Свежие файлы (моложе
+IMAGE_GC_GRACE секунд) не трогаются: пост с ними может быть еще не
+сохранен.
+"""
+import posixpath
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from posts.models import Post
+from posts.thumbnails import invalidate_image
+
+GC_BATCH_SIZE = 1000
+
+
+def _storage():
+    return Post._meta.get_field('image').storage
+
+
+def dedupe(dry_run=False):
+    """Перевести картинки на хешированные имена.
+
+    Возвращает (число старых файлов, число перепривязанных постов).
+    """
+    storage = _storage()
+    names = (
+        Post.objects.exclude(image='')
+        .order_by()
+        .values_list('image', flat=True)
+        .distinct()
+    )
+    files = posts = 0
+    for name in list(names):
+        if storage.is_hashed(name) or not storage.exists(name):
+            continue
+        with storage.open(name) as source:
+            if dry_run:
+                new_name = storage.hashed_name(name, source)
+            else:
+                new_name = storage.save(name, source)
+        files += 1
+        if dry_run:
+            posts += Post.objects.filter(image=name).count()
+            continue
+        posts += Post.objects.filter(image=name).update(image=new_name)
+        invalidate_image(new_name)
+    return files, posts
+
+
+def stored_files(storage, directory):
+    if not storage.exists(directory):
+        return
+    directories, files = storage.listdir(directory)
+    for filename in files:
+        yield posixpath.join(directory, filename)
+    for subdirectory in directories:
+        yield from stored_files(
+            storage, posixpath.join(directory, subdirectory)
+        )
+
+
+def _orphans(storage, names):
+    used = set(
+        Post.objects.filter(image__in=names).values_list('image', flat=True)
+    )
+    return [name for name in names if name not in used]
+
+
+def collect_garbage(grace=None, dry_run=False):
+    """Удалить файлы без постов, вернуть список удаленных имен."""
+    storage = _storage()
+    grace = settings.IMAGE_GC_GRACE if grace is None else grace
+    cutoff = timezone.now() - timedelta(seconds=grace)
+    directory = Post._meta.get_field('image').upload_to.rstrip('/')
+    batch = []
+    removed = []
+
+    def flush():
+        for name in _orphans(storage, batch):
+            # Пока искали ссылки, файл могли загрузить заново: save
+            # обновляет время изменения совпавшего файла.
+            if storage.get_modified_time(name) > cutoff:
+                continue
+            removed.append(name)
+            if not dry_run:
+                # Миниатюры файлов, загруженных до смены хранилища,
+                # записаны в kvstore под ключом хранилища по умолчанию.
+                for owner in (storage, default.storage):
+                    default.kvstore.delete(ImageFile(name, owner))
+                storage.delete(name)
+        batch.clear()
+
+    for name in stored_files(storage, directory):
+        if storage.get_modified_time(name) > cutoff:
+            continue
+        batch.append(name)
+        if len(batch) >= GC_BATCH_SIZE:
+            flush()
+    flush()
+    return removed
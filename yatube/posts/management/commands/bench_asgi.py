@@ -0,0 +1,122 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db.backends.signals import connection_created
+
+from core.asgi import AsgiHandler, build_environ
+
+
+def scope_for(path):
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': b'',
+        'headers': [(b'host', b'localhost')],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить запросы в секунду через WSGI (фиксированное число '
+        'потоков-воркеров) и через yatube.asgi при параллельной нагрузке. '
+        'Страницы читают текущую базу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Потоков у WSGI-сервера.',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=settings.ASGI_THREADS,
+            help='Размер пула ASGI-обработчика.',
+        )
+        parser.add_argument(
+            '--io-delay', type=float, default=0,
+            help='Задержка каждого SQL-запроса в мс (удаленная база).',
+        )
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Адрес страницы, можно несколько; по умолчанию /.',
+        )
+
+    def handle(self, *args, **options):
+        paths = (options['paths'] or ['/']) * options['requests']
+        paths = paths[:options['requests']]
+        delay = options['io_delay'] / 1000
+
+        def slow_io(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def add_delay(sender, connection, **kwargs):
+            # Объект соединения переживает переподключение вместе со
+            # списком оберток.
+            if slow_io not in connection.execute_wrappers:
+                connection.execute_wrappers.append(slow_io)
+
+        if delay:
+            connection_created.connect(add_delay)
+        try:
+            application = get_wsgi_application()
+            results = {
+                'wsgi': self.run_wsgi(application, paths, options['workers']),
+                'asgi': asyncio.run(self.run_asgi(
+                    AsgiHandler(application, options['threads']),
+                    paths, options['concurrency'],
+                )),
+            }
+        finally:
+            connection_created.disconnect(add_delay)
+        self.stdout.write(f'{"вход":>6} {"запросов/с":>12} {"ошибок":>8}')
+        for name, (rate, errors) in results.items():
+            self.stdout.write(f'{name:>6} {rate:>12.1f} {errors:>8}')
+
+    @staticmethod
+    def run_wsgi(application, paths, workers):
+        def request(path):
+            status = []
+            environ = build_environ(scope_for(path), None)
+            chunks = application(
+                environ, lambda code, headers: status.append(code)
+            )
+            b''.join(chunks)
+            chunks.close()
+            return status[0].startswith('200')
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(workers) as pool:
+            statuses = list(pool.map(request, paths))
+        elapsed = time.perf_counter() - started
+        return len(paths) / elapsed, statuses.count(False)
+
+    @staticmethod
+    async def run_asgi(handler, paths, concurrency):
+        limit = asyncio.Semaphore(concurrency)
+
+        async def request(path):
+            statuses = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            async with limit:
+                await handler(scope_for(path), receive, send)
+            return statuses == [200]
+
+        started = time.perf_counter()
+        statuses = await asyncio.gather(*(request(path) for path in paths))
+        elapsed = time.perf_counter() - started
+        handler.executor.shutdown()
+        return len(paths) / elapsed, statuses.count(False)
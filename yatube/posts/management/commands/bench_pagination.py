@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+
+from posts.benchmarks import measure, rollback, seed_posts
+from posts.models import Post, User
+from posts.pagination import NEXT, CursorPaginator, encode_cursor
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить задержку первой и дальней страницы ленты '
+        'для OFFSET- и keyset-пагинации.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=200000)
+        parser.add_argument('--page', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        per_page = settings.MAX_RECORDS
+        far_page = options['page']
+        if options['posts'] < far_page * per_page:
+            raise CommandError(
+                f'Для страницы {far_page} нужно не меньше '
+                f'{far_page * per_page} постов.'
+            )
+        with rollback():
+            author = User.objects.create(username='bench_pagination')
+            seed_posts(author, options['posts'])
+            posts = Post.objects.all()
+            self.stdout.write(f'{"страница":>10} {"offset, мс":>12} '
+                              f'{"cursor, мс":>12}')
+            for number in (1, far_page):
+                offset_ms = measure(
+                    lambda: list(Paginator(posts, per_page).page(number)),
+                    options['repeat'],
+                )
+                cursor = self.cursor_for(posts, number, per_page)
+                paginator = CursorPaginator(posts, per_page)
+                cursor_ms = measure(
+                    lambda: list(paginator.page(cursor)), options['repeat']
+                )
+                self.stdout.write(
+                    f'{number:>10} {offset_ms:>12.2f} {cursor_ms:>12.2f}'
+                )
+
+    @staticmethod
+    def cursor_for(posts, number, per_page):
+        if number == 1:
+            return None
+        boundary = posts.order_by('-pub_date', '-pk')[
+            (number - 1) * per_page - 1
+        ]
+        return encode_cursor(NEXT, boundary.pub_date, boundary.pk)
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+
+from posts.benchmarks import measure, rollback, seed_posts
+from posts.models import Post, User
+from posts.templatetags.post_cards import post_cards
+
+TEXT = 'Строка поста с переносами.\n' * 40
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить рендеринг страницы ленты из MAX_RECORDS карточек '
+        'без кеша фрагментов и с ним.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with rollback():
+            author = User.objects.create(username='bench_cards')
+            seed_posts(
+                author, settings.MAX_RECORDS, text=lambda number: TEXT
+            )
+            posts = list(
+                Post.objects.filter(author=author).select_related(
+                    'author', 'group'
+                )
+            )
+
+            def without_cache():
+                for post in posts:
+                    render_to_string(
+                        'posts/includes/post.html', {'post': post}
+                    )
+
+            def cold():
+                cache.clear()
+                post_cards(posts)
+
+            results = (
+                ('без кеша', measure(without_cache, options['repeat'])),
+                ('кеш пуст', measure(cold, options['repeat'])),
+                ('кеш прогрет', measure(
+                    lambda: post_cards(posts), options['repeat']
+                )),
+            )
+            self.stdout.write(f'{"вариант":>12} {"мс":>10}')
+            for name, elapsed in results:
+                self.stdout.write(f'{name:>12} {elapsed:>10.2f}')
@@ -0,0 +1,54 @@
+import random
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.benchmarks import measure, rollback, seed_posts
+from posts.models import User
+from posts.search import IcontainsBackend, SqliteFTSBackend
+
+WORDS = (
+    'солнце мороз день чудесный буря мгла небо вихрь снег зима дорога '
+    'лес река поле город дом окно утро вечер ночь ветер песня друг'
+).split()
+TAGS = [f'тег{number}' for number in range(20000)]
+# Частое слово, редкое слово и их сочетание.
+QUERIES = ('солнце', 'тег123', 'мороз тег42')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить поиск через FTS5 и через icontains '
+        '(LIKE с полным просмотром таблицы).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        generator = random.Random(0)
+
+        def text(number):
+            words = generator.choices(WORDS, k=8)
+            return ' '.join(words + generator.choices(TAGS, k=2))
+
+        backends = {
+            'icontains': IcontainsBackend(),
+            'fts5': SqliteFTSBackend(),
+        }
+        with rollback():
+            author = User.objects.create(username='bench_search')
+            seed_posts(author, options['posts'], text=text)
+            backends['fts5'].rebuild()
+            self.stdout.write(f'{"запрос":>12} {"бэкенд":>10} {"мс":>10}')
+            for query in QUERIES:
+                for name, backend in backends.items():
+                    def first_page():
+                        results = backend.search(query)
+                        results.count()
+                        list(results[:settings.MAX_RECORDS])
+                    elapsed = measure(first_page, options['repeat'])
+                    self.stdout.write(
+                        f'{query:>12} {name:>10} {elapsed:>10.1f}'
+                    )
@@ -0,0 +1,85 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageOps
+
+from posts import uploads
+from posts.benchmarks import measure
+
+THUMBNAIL = (960, 339)
+
+
+def photo_like(size):
+    # Градиент с шумом сжимается примерно как фотография, а не как заливка.
+    gradient = Image.linear_gradient('L').resize(size)
+    channels = [
+        Image.blend(gradient, Image.effect_noise(size, 48), 0.3)
+        for _ in range(3)
+    ]
+    return Image.merge('RGB', channels)
+
+
+def encode(image, file_format):
+    output = BytesIO()
+    image.save(output, file_format, quality=90)
+    return output.getvalue()
+
+
+def thumbnail(file_):
+    file_.seek(0)
+    ImageOps.fit(Image.open(file_), THUMBNAIL)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить сохранение больших JPEG и PNG как есть и через '
+        'posts.uploads: время, размер файла и время миниатюры.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--width', type=int, default=4000)
+        parser.add_argument('--height', type=int, default=3000)
+
+    def handle(self, *args, **options):
+        image = photo_like((options['width'], options['height']))
+        sources = {
+            'JPEG': encode(image, 'JPEG'),
+            # PNG-фото полного размера больше IMAGE_MAX_UPLOAD_SIZE.
+            'PNG': encode(image.reduce(2), 'PNG'),
+        }
+        location = tempfile.mkdtemp()
+        storage = FileSystemStorage(location=location)
+        try:
+            self.stdout.write(
+                f'{"формат":>7} {"вариант":>10} {"сохранение, мс":>15} '
+                f'{"размер, КБ":>11} {"миниатюра, мс":>14}'
+            )
+            for file_format, data in sources.items():
+                name = f'source.{file_format.lower()}'
+                for variant, prepare in (
+                    ('как есть', lambda upload: upload),
+                    ('конвейер', uploads.process),
+                ):
+                    saved = []
+
+                    def save():
+                        upload = SimpleUploadedFile(name, data)
+                        saved.append(storage.save(name, prepare(upload)))
+
+                    elapsed = measure(save, options['repeat'])
+                    with storage.open(saved[-1]) as stored:
+                        size = storage.size(saved[-1]) / 1024
+                        thumb = measure(
+                            lambda: thumbnail(stored), options['repeat']
+                        )
+                    self.stdout.write(
+                        f'{file_format:>7} {variant:>10} {elapsed:>15.1f} '
+                        f'{size:>11.0f} {thumb:>14.1f}'
+                    )
+        finally:
+            shutil.rmtree(location, ignore_errors=True)
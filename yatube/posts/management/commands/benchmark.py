@@ -0,0 +1,120 @@
+import json
+import subprocess
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from posts.benchmarks import Dataset, profile_call, rollback
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполнить базу реалистичными данными и замерить задержки, число '
+        'запросов и память основных страниц. Данные откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--follows', type=int, default=20)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='Не очищать кеш между запросами.',
+        )
+        parser.add_argument('--output', help='Куда записать JSON')
+        parser.add_argument('--compare', help='JSON прошлого запуска')
+
+    def handle(self, *args, **options):
+        with rollback():
+            dataset = Dataset(
+                options['users'],
+                options['groups'],
+                options['posts'],
+                options['follows'],
+                options['comments'],
+            ).build()
+            results = self.run(dataset, options)
+        report = {
+            'commit': self.commit(),
+            'dataset': dataset.sizes,
+            'warm': options['warm'],
+            'views': results,
+        }
+        self.print_report(report, options['compare'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+
+    def scenarios(self, dataset):
+        group = dataset.groups[0]
+        post = dataset.post
+        return {
+            'posts:index': ('get', reverse('posts:index'), None),
+            'posts:group_list': (
+                'get', reverse('posts:group_list', args=[group.slug]), None
+            ),
+            'posts:profile': (
+                'get',
+                reverse('posts:profile', args=[dataset.author.username]),
+                None,
+            ),
+            'posts:post_detail': (
+                'get', reverse('posts:post_detail', args=[post.pk]), None
+            ),
+            'posts:follow_index': ('get', reverse('posts:follow_index'), None),
+            'posts:post_create': (
+                'post', reverse('posts:post_create'), {'text': 'Замер'}
+            ),
+            'posts:add_comment': (
+                'post',
+                reverse('posts:add_comment', args=[post.pk]),
+                {'text': 'Замер'},
+            ),
+        }
+
+    def run(self, dataset, options):
+        client = Client()
+        client.force_login(dataset.reader)
+        results = {}
+        for name, (method, url, data) in self.scenarios(dataset).items():
+            def request():
+                if not options['warm']:
+                    cache.clear()
+                response = getattr(client, method)(url, data)
+                assert response.status_code in (200, 302), response
+            results[name] = profile_call(request, options['requests'])
+        return results
+
+    @staticmethod
+    def commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def print_report(self, report, compare):
+        previous = {}
+        if compare:
+            with open(compare, encoding='utf-8') as source:
+                previous = json.load(source)['views']
+        self.stdout.write(
+            f'{"страница":<20}{"p50":>9}{"p90":>9}{"p99":>9}'
+            f'{"запросы":>9}{"память, КБ":>12}{"Δp50":>9}'
+        )
+        for name, row in report['views'].items():
+            delta = ''
+            if name in previous:
+                delta = f'{row["p50_ms"] - previous[name]["p50_ms"]:+.2f}'
+            self.stdout.write(
+                f'{name:<20}{row["p50_ms"]:>9.2f}{row["p90_ms"]:>9.2f}'
+                f'{row["p99_ms"]:>9.2f}{row["queries"]:>9}'
+                f'{row["peak_kb"]:>12.1f}{delta:>9}'
+            )
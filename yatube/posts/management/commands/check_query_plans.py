@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from posts.benchmarks import Dataset, rollback
+from posts.explain import check_views
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполнить EXPLAIN для запросов каждой страницы ленты и завершиться '
+        'ошибкой, если есть полный просмотр таблицы или временная '
+        'сортировка.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument(
+            '--allow', action='append', default=[],
+            help='Таблица, полный просмотр которой допустим.',
+        )
+
+    def handle(self, *args, **options):
+        with rollback():
+            dataset = Dataset(
+                users=options['users'],
+                groups=10,
+                posts=options['posts'],
+                follows=20,
+                comments=options['posts'],
+            ).build()
+            report = check_views(
+                self.urls(dataset), dataset.reader, options['allow']
+            )
+        for (name, sql), steps in report.items():
+            self.stdout.write(f'{name}: {sql}')
+            for step in steps:
+                self.stdout.write(f'    {step}')
+        if report:
+            raise CommandError(f'Проблемных запросов: {len(report)}')
+        self.stdout.write('Все запросы читают данные по индексам.')
+
+    def urls(self, dataset):
+        post = dataset.post
+        return {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse(
+                'posts:group_list', args=[dataset.groups[0].slug]
+            ),
+            'posts:profile': reverse(
+                'posts:profile', args=[dataset.author.username]
+            ),
+            'posts:post_detail': reverse(
+                'posts:post_detail', args=[post.pk]
+            ),
+            'posts:comments': reverse('posts:comments', args=[post.pk]),
+            'posts:follow_index': reverse('posts:follow_index'),
+            'posts:trending': reverse('posts:trending'),
+        }
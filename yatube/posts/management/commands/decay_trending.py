@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Уменьшить рейтинги популярных постов. Запускается из cron раз в '
+        'TRENDING_DECAY_INTERVAL секунд; --rebuild пересчитывает рейтинг '
+        'заново по комментариям.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            count = trending.rebuild()
+            self.stdout.write(f'Постов в рейтинге: {count}')
+            return
+        removed = trending.decay()
+        self.stdout.write(f'Удалено угасших постов: {removed}')
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts import images
+
+
+class Command(BaseCommand):
+    help = (
+        'Перевести картинки постов на имена по содержимому, слить '
+        'одинаковые и удалить файлы, на которые не ссылается ни один пост.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int,
+            help='Не удалять файлы моложе стольких секунд.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет сделано.',
+        )
+
+    def handle(self, *args, **options):
+        files, posts = images.dedupe(options['dry_run'])
+        self.stdout.write(
+            f'Переименовано файлов: {files}, постов: {posts}'
+        )
+        removed = images.collect_garbage(
+            options['grace'], options['dry_run']
+        )
+        for name in removed:
+            self.stdout.write(f'    {name}')
+        self.stdout.write(f'Удалено файлов без постов: {len(removed)}')
@@ -0,0 +1,36 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.exporters import FORMATS, export
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Выгрузить посты группы или автора с комментариями.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', help='slug группы')
+        parser.add_argument('--author', help='username автора')
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument('--output', help='Файл, по умолчанию stdout')
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        if not options['group'] and not options['author']:
+            raise CommandError('Укажите --group или --author')
+        posts = Post.objects.all()
+        if options['group']:
+            posts = posts.filter(group__slug=options['group'])
+        if options['author']:
+            posts = posts.filter(author__username=options['author'])
+        chunks = export(posts, options['format'], options['chunk_size'])
+        if not options['output']:
+            sys.stdout.writelines(chunks)
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as output:
+            output.writelines(chunks)
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import timeline
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Пересобрать материализованные ленты подписок с нуля.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пользователи, чьи ленты пересобрать (по умолчанию все).',
+        )
+        parser.add_argument(
+            '--pending', action='store_true',
+            help='Только разложить историю авторов, вернувшихся под '
+                 'TIMELINE_FANOUT_LIMIT (для запуска по расписанию).',
+        )
+
+    def handle(self, *args, **options):
+        delivered = timeline.deliver_pending()
+        self.stdout.write(f'Разложена история авторов: {delivered}')
+        if options['pending']:
+            return
+        users = User.objects.order_by('pk')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        rebuilt = 0
+        for user in users.iterator():
+            with transaction.atomic():
+                timeline.rebuild(user)
+            rebuilt += 1
+        self.stdout.write(f'Пересобрано лент: {rebuilt}')
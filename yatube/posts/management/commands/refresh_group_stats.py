@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import group_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитать статистику групп для каталога. Запускается '
+        'периодически, например раз в несколько минут из cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, help='Сколько авторов хранить для группы.'
+        )
+
+    def handle(self, *args, **options):
+        count = group_stats.refresh(options['top'])
+        self.stdout.write(f'Пересчитано групп: {count}')
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_image_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='heavy',
+            field=models.BooleanField(default=False, verbose_name='Без раскладки по лентам'),
+        ),
+    ]
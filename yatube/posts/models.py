@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from posts.storage import image_storage
+
 User = get_user_model()
 
 
@@ -37,7 +39,10 @@ class Post(models.Model):
         'Картинка',
         help_text='Загрузите подходящую картинку',
         upload_to='posts/',
+        storage=image_storage,
         blank=True,
+        # Поиск постов по имени файла: общие картинки, сборка мусора.
+        db_index=True,
     )
     group = models.ForeignKey(
         'Group',
@@ -48,14 +53,40 @@ class Post(models.Model):
         help_text='Укажите группу для поста',
         verbose_name='Группа поста',
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name_plural = 'Посты'
+        # Ленты группы и автора: фильтр и сортировка по одному индексу.
+        indexes = [
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        # Счетчик меняется только через F(), иначе сохранение старой
+        # копии поста затрет комментарии, добавленные после загрузки.
+        if not self._state.adding and not kwargs.get('update_fields'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'comments_count'
+            ]
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -83,6 +114,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx',
+            )
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -109,3 +146,156 @@ class Follow(models.Model):
                 name='unique_author_user_following',
             )
         ]
+        # Подписчики автора; подписки читателя покрывает unique-индекс.
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx',
+            )
+        ]
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счетчики пользователя."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков', default=0
+    )
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+    # Посты подмешиваются в ленты при чтении (posts.timeline).
+    heavy = models.BooleanField('Без раскладки по лентам', default=False)
+
+    class Meta:
+        verbose_name_plural = 'Счетчики пользователей'
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class GroupStats(models.Model):
+    """Сводка группы для каталога, пересчитывается refresh_group_stats."""
+
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Группа',
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    last_post_date = models.DateTimeField(
+        'Последний пост', null=True, blank=True
+    )
+    updated = models.DateTimeField('Пересчитано', auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Статистика групп'
+
+    def __str__(self):
+        return str(self.group_id)
+
+
+class GroupTopAuthor(models.Model):
+    """Самые активные авторы группы на момент пересчета."""
+
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='top_authors',
+        verbose_name='Группа',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+
+    class Meta:
+        ordering = ('group', '-posts_count', 'author')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['group', 'author'],
+                name='unique_group_top_author',
+            )
+        ]
+
+
+class PostScore(models.Model):
+    """Затухающий рейтинг поста для ленты популярного (posts.trending)."""
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+        verbose_name='Пост',
+    )
+    score = models.FloatField('Рейтинг', default=0)
+
+    class Meta:
+        verbose_name_plural = 'Рейтинг постов'
+        indexes = [
+            models.Index(
+                fields=['-score', '-post'], name='post_score_rank_idx'
+            )
+        ]
+
+    def __str__(self):
+        return str(self.post_id)
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: пост, доставленный читателю."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_user_post',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx',
+            )
+        ]
+
+
+class ImportCheckpoint(models.Model):
+    """Сколько строк файла уже импортировано командой import_posts."""
+
+    source = models.CharField('Источник', max_length=500, unique=True)
+    rows_done = models.BigIntegerField('Обработано строк', default=0)
+    updated = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Отметки импорта'
+
+    def __str__(self):
+        return self.source
@@ -0,0 +1,125 @@
+import base64
+import binascii
+
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor(direction, value, pk):
+    """Упаковать позицию (direction, value, pk) в непрозрачный токен."""
+    raw = f'{direction}|{value.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковать токен курсора, InvalidCursor если он поврежден."""
+    padding = '=' * (-len(token) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(token + padding).decode()
+        direction, value, pk = raw.split('|')
+        value = parse_datetime(value)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor('Некорректный курсор')
+    if direction not in (NEXT, PREVIOUS) or value is None:
+        raise InvalidCursor('Некорректный курсор')
+    return direction, value, pk
+
+
+class CursorPage(Page):
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def _cursor(self, direction, obj):
+        fields = (self.paginator.key_field, self.paginator.pk_field)
+        if isinstance(obj, dict):
+            # Выборка через values() отдает словари.
+            key, pk = (obj[field] for field in fields)
+        else:
+            key, pk = (getattr(obj, field) for field in fields)
+        return encode_cursor(direction, key, pk)
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return self._cursor(NEXT, self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return self._cursor(PREVIOUS, self.object_list[0])
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по (key_field, pk_field) без COUNT(*) и OFFSET.
+
+    Стоимость любой страницы одинакова: выборка начинается с позиции
+    из курсора по индексу, а не пропускает предыдущие записи.
+    Условие key <= value задает границу диапазона индекса, уточнение
+    по pk_field лишь отсекает уже показанные записи с тем же ключом.
+    """
+
+    cursor_mode = True
+
+    def __init__(self, object_list, per_page, key_field='pub_date',
+                 pk_field='pk'):
+        self.key_field = key_field
+        self.pk_field = pk_field
+        super().__init__(
+            object_list.order_by(f'-{key_field}', f'-{pk_field}'), per_page
+        )
+
+    def page(self, cursor=None):
+        limit = self.per_page + 1
+        if not cursor:
+            items = list(self.object_list[:limit])
+            return CursorPage(
+                items[:self.per_page], self, len(items) == limit, False
+            )
+        direction, value, pk = decode_cursor(cursor)
+        field, pk_field = self.key_field, self.pk_field
+        if direction == NEXT:
+            keyset = Q(**{f'{field}__lte': value}) & (
+                Q(**{f'{field}__lt': value}) | Q(**{f'{pk_field}__lt': pk})
+            )
+            items = list(self.object_list.filter(keyset)[:limit])
+            return CursorPage(
+                items[:self.per_page], self, len(items) == limit, True
+            )
+        keyset = Q(**{f'{field}__gte': value}) & (
+            Q(**{f'{field}__gt': value}) | Q(**{f'{pk_field}__gt': pk})
+        )
+        items = list(
+            self.object_list.filter(keyset).order_by(field, pk_field)[:limit]
+        )
+        return CursorPage(
+            items[:self.per_page][::-1], self, True, len(items) == limit
+        )
+
+    def get_page(self, cursor=None):
+        """Как Paginator.get_page: битый курсор дает первую страницу."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
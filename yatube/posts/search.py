@@ -0,0 +1,142 @@
+"""Полнотекстовый поиск по постам.
+
+Бэкенд выбирается настройкой SEARCH_BACKEND. SqliteFTSBackend хранит
+инвертированный индекс в виртуальной таблице FTS5 posts_post_fts
+(rowid совпадает с id поста) и ранжирует результаты по bm25.
+IcontainsBackend — запасной вариант для баз без FTS.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from posts.models import Post
+
+FTS_TABLE = 'posts_post_fts'
+WORD = re.compile(r'\w+')
+
+
+class BaseSearchBackend:
+    def index(self, post):
+        pass
+
+    def index_many(self, posts):
+        for post in posts:
+            self.index(post)
+
+    def remove(self, post_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, query, group=None, author=None):
+        """Последовательность постов для Paginator: count() и срезы."""
+        raise NotImplementedError
+
+
+class IcontainsBackend(BaseSearchBackend):
+    def search(self, query, group=None, author=None):
+        posts = Post.objects.select_related('author', 'group').filter(
+            text__icontains=query
+        )
+        if group is not None:
+            posts = posts.filter(group=group)
+        if author is not None:
+            posts = posts.filter(author=author)
+        return posts
+
+
+class SqliteSearchResults:
+    def __init__(self, match, group=None, author=None):
+        self.where = [f'{FTS_TABLE} MATCH %s']
+        self.params = [match]
+        if group is not None:
+            self.where.append('post.group_id = %s')
+            self.params.append(group.pk)
+        if author is not None:
+            self.where.append('post.author_id = %s')
+            self.params.append(author.pk)
+
+    def _execute(self, select, tail='', params=()):
+        sql = (
+            f'SELECT {select} FROM {FTS_TABLE} '
+            f'JOIN posts_post AS post ON post.id = {FTS_TABLE}.rowid '
+            f'WHERE {" AND ".join(self.where)} {tail}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*self.params, *params])
+            return cursor.fetchall()
+
+    def count(self):
+        return self._execute('COUNT(*)')[0][0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start = item.start or 0
+        limit = -1 if item.stop is None else item.stop - start
+        rows = self._execute(
+            'post.id',
+            f'ORDER BY bm25({FTS_TABLE}), post.id DESC LIMIT %s OFFSET %s',
+            (limit, start),
+        )
+        ids = [row[0] for row in rows]
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+class SqliteFTSBackend(BaseSearchBackend):
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text],
+            )
+
+    def index_many(self, posts):
+        rows = [(post.pk, post.text) for post in posts]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(pk,) for pk, _ in rows],
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE}(rowid, text) VALUES (%s, %s)', rows
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, text) '
+                'SELECT id, text FROM posts_post'
+            )
+
+    @staticmethod
+    def to_match(query):
+        # Каждое слово в кавычках: синтаксис FTS5 из ввода не исполняется.
+        return ' '.join(f'"{word}"' for word in WORD.findall(query))
+
+    def search(self, query, group=None, author=None):
+        match = self.to_match(query)
+        if not match:
+            return Post.objects.none()
+        return SqliteSearchResults(match, group, author)
+
+
+def get_backend():
+    return import_string(settings.SEARCH_BACKEND)()
@@ -0,0 +1,129 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from posts import trending
+from posts.cache import bump
+from posts.counters import change_author_stats, change_comments_count
+from posts.models import AuthorStats, Comment, Follow, Group, Post, User
+from posts.search import get_backend as search_backend
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_group(sender, instance, **kwargs):
+    instance._old_group_slug = None
+    if instance.pk:
+        instance._old_group_slug = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group__slug', flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    scopes = {
+        'index',
+        f'author:{instance.author.username}',
+        f'post:{instance.pk}',
+    }
+    if instance.group_id:
+        scopes.add(f'group:{instance.group.slug}')
+    old_group = getattr(instance, '_old_group_slug', None)
+    if old_group:
+        scopes.add(f'group:{old_group}')
+    bump(*scopes)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment(sender, instance, **kwargs):
+    bump(f'comments:{instance.post_id}')
+    # Число комментариев выводится в лентах, поэтому сбрасываются и они.
+    post = Post.objects.filter(pk=instance.post_id).select_related(
+        'author', 'group'
+    ).first()
+    if post is not None:
+        invalidate_post(Post, post)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow(sender, instance, **kwargs):
+    scopes = (
+        f'follow:{instance.user_id}',
+        f'author:{instance.author.username}',
+        f'author:{instance.user.username}',
+    )
+    transaction.on_commit(lambda: bump(*scopes))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    # Новая группа видна в каталоге сразу, ее числа — после пересчета.
+    bump('groups', f'group:{instance.slug}')
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        change_author_stats(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    change_author_stats(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        change_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    if created:
+        change_author_stats(instance.author_id, followers_count=1)
+        change_author_stats(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    change_author_stats(instance.author_id, followers_count=-1)
+    change_author_stats(instance.user_id, following_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search_backend().index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search_backend().remove(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def rank_new_comment(sender, instance, created, **kwargs):
+    if created and instance.post_id:
+        trending.comment_added(instance.post_id)
+
+
+@receiver(post_save, sender=Follow)
+def rank_new_follow(sender, instance, created, **kwargs):
+    if created:
+        trending.follow_added(instance.user_id, instance.author_id)
@@ -0,0 +1,58 @@
+"""Хранилище картинок постов с именами по содержимому.
+
+Файл сохраняется как <каталог>/<xx>/<sha256><расширение>: одинаковые
+загрузки получают одно имя и записываются один раз, а миниатюры sorl,
+имя которых выводится из имени исходника, строятся один раз для всех
+постов с этой картинкой. Удаление поста файл не трогает — картинка
+может быть нужна другим постам; сироты удаляет команда dedupe_images.
+"""
+import hashlib
+import os
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASHED_NAME = re.compile(r'(?:^|/)([0-9a-f]{2})/\1[0-9a-f]{62}(?:\.\w+)?$')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        hexdigest = digest.hexdigest()
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(
+            directory, hexdigest[:2], f'{hexdigest}{extension}'
+        )
+
+    @staticmethod
+    def is_hashed(name):
+        return HASHED_NAME.search(name) is not None
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Совпавший файл мог быть сиротой: свежее время изменения
+            # защищает его от collect_garbage, пока пост не сохранен.
+            try:
+                os.utime(self.path(name))
+            except FileNotFoundError:
+                return super().save(name, content, max_length)
+            return name
+        # Одновременная запись того же файла получит суффикс от
+        # get_available_name; такой дубль сольет dedupe_images.
+        return super().save(name, content, max_length)
+
+
+image_storage = ContentAddressedStorage()
@@ -0,0 +1,27 @@
+from django import template
+from django.template.loader import render_to_string
+
+from posts.cache import cached_fragments
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Пары (пост, карточка) с карточками posts/includes/post.html из кеша.
+
+    Карточка зависит от области post:<id>, которую сбрасывают правка и
+    удаление поста, новые комментарии и готовые миниатюры. Имя автора
+    входит в ключ, поэтому его смена тоже дает новую карточку.
+    """
+    posts = list(posts)
+    cards = cached_fragments(
+        'post_card',
+        posts,
+        lambda post: [f'post:{post.pk}'],
+        lambda post: [post.pk, post.author.username],
+        lambda post: render_to_string(
+            'posts/includes/post.html', {'post': post}
+        ),
+    )
+    return list(zip(posts, cards))
@@ -0,0 +1,116 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(API_PAGE_SIZE=2)
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='api_author')
+        cls.reader = User.objects.create_user(username='api_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='api', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = []
+        for number in range(3):
+            post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+            timeline.fan_out(post)
+            cls.posts.append(post)
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_pages_cover_all_posts(self):
+        url = reverse('api:posts')
+        ids = []
+        while url:
+            data = self.client.get(url).json()
+            ids += [item['id'] for item in data['results']]
+            url = data['next']
+        self.assertEqual(ids, [post.pk for post in reversed(self.posts)])
+
+    def test_sparse_fieldsets(self):
+        data = self.client.get(
+            reverse('api:group_posts', args=['api']), {'fields': 'id,author'}
+        ).json()
+        self.assertEqual(
+            data['results'][0],
+            {'id': self.posts[2].pk, 'author': 'api_author'},
+        )
+        self.assertEqual(data['group']['slug'], 'api')
+        response = self.client.get(reverse('api:posts'), {'fields': 'secret'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_unchanged_feed_returns_304_without_queries(self):
+        url = reverse('api:profile_posts', args=['api_author'])
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        cached = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(cached.status_code, 304)
+
+    def test_changes_invalidate_etag(self):
+        url = reverse('api:comments', args=[self.posts[0].pk])
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(
+            post=self.posts[0], author=self.author, text='Ответ'
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_post_detail(self):
+        post = self.posts[0]
+        data = self.client.get(
+            reverse('api:post_detail', args=[post.pk])
+        ).json()
+        self.assertEqual(data['comments_count'], 1)
+        self.assertIsNone(data['image'])
+
+    def test_image_url_comes_from_storage(self):
+        post = self.posts[0]
+        Post.objects.filter(pk=post.pk).update(image='posts/ab/a b.jpg')
+        data = self.client.get(
+            reverse('api:post_detail', args=[post.pk])
+        ).json()
+        self.assertEqual(
+            data['image'],
+            Post._meta.get_field('image').storage.url('posts/ab/a b.jpg'),
+        )
+        self.assertNotIn(' ', data['image'])
+
+    def test_profile_without_stats_row(self):
+        """Автор без строки AuthorStats получает нулевые счетчики."""
+        AuthorStats.objects.filter(user=self.author).delete()
+        data = self.client.get(
+            reverse('api:profile_posts', args=['api_author'])
+        ).json()
+        self.assertEqual(data['author']['posts_count'], 0)
+        self.assertEqual(data['author']['followers_count'], 0)
+
+    def test_feed_requires_login(self):
+        url = reverse('api:feed')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.reader)
+        data = self.client.get(url, {'fields': 'id'}).json()
+        self.assertEqual(
+            [item['id'] for item in data['results']],
+            [self.posts[2].pk, self.posts[1].pk],
+        )
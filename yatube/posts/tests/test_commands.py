@@ -0,0 +1,234 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import cache as feed_cache
+from posts import images
+from posts.explain import check_views, problems
+from posts.storage import image_storage
+from posts.importers import PostImporter
+from posts.models import (
+    AuthorStats, Comment, Group, GroupStats, ImportCheckpoint, Post,
+    PostScore, User,
+)
+
+
+class ImportPostsCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='importer')
+        Group.objects.create(title='Группа', slug='imported', description='')
+
+    def setUp(self):
+        rows = [
+            {'text': f'Пост {number}', 'author': 'importer',
+             'group': 'imported' if number % 2 else ''}
+            for number in range(5)
+        ]
+        rows.append({'text': 'Чужой', 'author': 'nobody'})
+        handle, self.path = tempfile.mkstemp(suffix='.jsonl')
+        with os.fdopen(handle, 'w', encoding='utf-8') as source:
+            for row in rows:
+                source.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def import_posts(self):
+        call_command(
+            'import_posts', self.path, batch_size=2, stdout=StringIO()
+        )
+
+    def test_import_posts(self):
+        """Посты вставляются пачками, счетчики и отметка обновляются."""
+        self.import_posts()
+        self.assertEqual(Post.objects.filter(author=self.author).count(), 5)
+        self.assertEqual(
+            Post.objects.filter(group__slug='imported').count(), 2
+        )
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 5
+        )
+        self.assertEqual(
+            ImportCheckpoint.objects.get(source=self.path).rows_done, 6
+        )
+        self.import_posts()
+        self.assertEqual(Post.objects.filter(author=self.author).count(), 5)
+
+    def test_import_resumes_after_failure(self):
+        """После сбоя импорт продолжается с первой незаписанной пачки."""
+        original = PostImporter.insert
+        calls = []
+
+        def failing_insert(importer, rows, rows_done):
+            calls.append(rows_done)
+            if len(calls) == 2:
+                raise RuntimeError('сбой')
+            return original(importer, rows, rows_done)
+
+        with patch.object(PostImporter, 'insert', failing_insert):
+            with self.assertRaises(RuntimeError):
+                self.import_posts()
+        self.assertEqual(Post.objects.filter(author=self.author).count(), 2)
+        self.import_posts()
+        self.assertEqual(Post.objects.filter(author=self.author).count(), 5)
+
+
+class CheckQueryPlansCommandTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_queries_use_indexes(self):
+        out = StringIO()
+        call_command(
+            'check_query_plans', users=20, posts=300, stdout=out
+        )
+        self.assertIn('по индексам', out.getvalue())
+
+    @override_settings(ALLOWED_HOSTS=['.example.com'])
+    def test_pages_are_requested_on_allowed_host(self):
+        out = StringIO()
+        call_command('check_query_plans', users=5, posts=20, stdout=out)
+        self.assertIn('по индексам', out.getvalue())
+
+    def test_unchecked_pages_are_problems(self):
+        """Редирект и страница без запросов не проходят проверку."""
+        report = check_views({
+            'posts:follow_index': reverse('posts:follow_index'),
+            'about:author': reverse('about:author'),
+        })
+        self.assertEqual(
+            sorted(report.values()),
+            [['Нет ни одного SELECT'], ['Ответ 302']],
+        )
+
+    def test_measurements_do_not_touch_shared_cache(self):
+        cache.set('shared', 'value')
+        call_command('benchmark', users=5, groups=2, posts=20, follows=2,
+                     comments=5, requests=1, stdout=StringIO())
+        self.assertEqual(cache.get('shared'), 'value')
+        self.assertIsNone(cache.get(feed_cache.VERSION_KEY.format('index')))
+
+    def test_scans_and_sorts_are_problems(self):
+        plan = [
+            '2 0 0 SCAN posts_post',
+            '3 0 0 SCAN posts_group USING INDEX group_idx',
+            '4 0 0 USE TEMP B-TREE FOR ORDER BY',
+        ]
+        self.assertEqual(problems(plan), [plan[0], plan[2]])
+        self.assertEqual(problems(plan, ['posts_post']), [plan[2]])
+        self.assertEqual(problems(['1 0 0 SCAN subquery']), [])
+
+    def test_command_fails_on_problems(self):
+        report = {('posts:index', 'SELECT 1'): ['SCAN posts_post']}
+        with patch(
+            'posts.management.commands.check_query_plans.check_views',
+            return_value=report,
+        ):
+            with self.assertRaises(CommandError):
+                call_command(
+                    'check_query_plans', users=2, posts=1, stdout=StringIO()
+                )
+
+
+class RefreshGroupStatsCommandTests(TestCase):
+    def test_refresh_replaces_stats(self):
+        author = User.objects.create_user(username='stats_author')
+        group = Group.objects.create(title='Г', slug='stats', description='')
+        Post.objects.create(author=author, group=group, text='Пост')
+        GroupStats.objects.create(group=group, posts_count=40)
+        out = StringIO()
+        call_command('refresh_group_stats', stdout=out)
+        self.assertIn('Пересчитано групп: 1', out.getvalue())
+        self.assertEqual(GroupStats.objects.get(group=group).posts_count, 1)
+        self.assertEqual(group.top_authors.get().author, author)
+
+
+class DecayTrendingCommandTests(TestCase):
+    def test_decay_and_rebuild(self):
+        author = User.objects.create_user(username='trend')
+        post = Post.objects.create(author=author, text='Пост')
+        Comment.objects.create(post=post, author=author, text='К')
+        PostScore.objects.filter(post=post).update(score=0.01)
+        out = StringIO()
+        call_command('decay_trending', stdout=out)
+        self.assertIn('Удалено угасших постов: 1', out.getvalue())
+        call_command('decay_trending', rebuild=True, stdout=out)
+        self.assertIn('Постов в рейтинге: 1', out.getvalue())
+        self.assertTrue(PostScore.objects.filter(post=post))
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class DedupeImagesCommandTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def legacy_file(self, name, content, age=0):
+        # Файлы, сохраненные до хранилища с именами по содержимому.
+        path = os.path.join(TEMP_MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as output:
+            output.write(content)
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+        return name
+
+    def test_dedupe_and_collect_garbage(self):
+        author = User.objects.create_user(username='images')
+        for name in ('posts/a.gif', 'posts/b.gif'):
+            Post.objects.create(
+                author=author, text='П',
+                image=self.legacy_file(name, b'same', age=7200),
+            )
+        self.legacy_file('posts/orphan.gif', b'old', age=7200)
+        self.legacy_file('posts/fresh.gif', b'new')
+        out = StringIO()
+        call_command('dedupe_images', grace=3600, stdout=out)
+        self.assertIn('Переименовано файлов: 2, постов: 2', out.getvalue())
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        shared = names.pop()
+        self.assertEqual(
+            shared,
+            image_storage.hashed_name('posts/a.gif', ContentFile(b'same')),
+        )
+        self.assertTrue(image_storage.exists(shared))
+        for name in ('posts/a.gif', 'posts/b.gif', 'posts/orphan.gif'):
+            self.assertFalse(image_storage.exists(name))
+        self.assertTrue(image_storage.exists('posts/fresh.gif'))
+
+    def test_reupload_during_collection_keeps_file(self):
+        """Загрузка совпавшей сироты во время сборки мусора не теряет файл."""
+        orphan = image_storage.save('posts/a.gif', ContentFile(b'orphan'))
+        stamp = time.time() - 7200
+        os.utime(image_storage.path(orphan), (stamp, stamp))
+        find_orphans = images._orphans
+
+        def reupload(storage, names):
+            found = find_orphans(storage, names)
+            self.assertEqual(
+                image_storage.save('posts/b.gif', ContentFile(b'orphan')),
+                orphan,
+            )
+            return found
+
+        with patch('posts.images._orphans', reupload):
+            removed = images.collect_garbage(grace=3600)
+        self.assertEqual(removed, [])
+        self.assertTrue(image_storage.exists(orphan))
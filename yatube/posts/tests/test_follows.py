@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import cache as feed_cache
+from posts import follows
+from posts.models import AuthorStats, Follow
+
+User = get_user_model()
+
+
+class FollowTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_follow_is_single_idempotent_statement(self):
+        author = self.authors[0]
+        with CaptureQueriesContext(connection) as context:
+            self.assertTrue(follows.follow(self.reader, author))
+        touching = [
+            query['sql'] for query in context.captured_queries
+            if 'posts_follow' in query['sql']
+        ]
+        self.assertEqual(len(touching), 1)
+        self.assertTrue(touching[0].startswith('INSERT'))
+        self.assertFalse(follows.follow(self.reader, author))
+        self.assertFalse(follows.follow(self.reader, self.reader))
+        self.assertEqual(
+            AuthorStats.objects.get(user=author).followers_count, 1
+        )
+
+    def test_unfollow_twice(self):
+        author = self.authors[0]
+        follows.follow(self.reader, author)
+        self.assertTrue(follows.unfollow(self.reader, author))
+        self.assertFalse(follows.unfollow(self.reader, author))
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.reader).following_count, 0
+        )
+
+    def test_batch_endpoint(self):
+        client = Client()
+        client.force_login(self.reader)
+        follows.follow(self.reader, self.authors[0])
+        response = client.post(
+            reverse('posts:follow_batch'),
+            {'author': ['author0', 'author1', 'author2', 'reader', 'ghost']},
+        )
+        self.assertEqual(
+            sorted(response.json()['followed']), ['author1', 'author2']
+        )
+        self.assertEqual(Follow.objects.filter(user=self.reader).count(), 3)
+        self.assertEqual(
+            client.get(reverse('posts:follow_batch')).status_code, 405
+        )
+
+
+class ConcurrentFollowTests(TransactionTestCase):
+    THREADS = 8
+    ROUNDS = 5
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='popular')
+        self.readers = [
+            User.objects.create_user(username=f'reader{number}')
+            for number in range(self.THREADS)
+        ]
+
+    def hammer(self, reader):
+        client = Client()
+        client.force_login(reader)
+        follow = reverse('posts:profile_follow', args=['popular'])
+        unfollow = reverse('posts:profile_unfollow', args=['popular'])
+        try:
+            for _ in range(self.ROUNDS):
+                client.get(follow)
+                client.get(follow)
+                client.get(unfollow)
+            client.get(follow)
+        finally:
+            connections.close_all()
+
+    def test_cache_is_invalidated_after_commit(self):
+        """До коммита версия ленты подписок прежняя."""
+        scope = f'follow:{self.readers[0].pk}'
+        before = feed_cache.get_versions([scope])
+        with transaction.atomic():
+            follows.follow(self.readers[0], self.author)
+            self.assertEqual(feed_cache.get_versions([scope]), before)
+        self.assertNotEqual(feed_cache.get_versions([scope]), before)
+
+    def test_concurrent_follow_unfollow(self):
+        with ThreadPoolExecutor(self.THREADS) as pool:
+            list(pool.map(self.hammer, self.readers + self.readers))
+        self.assertEqual(
+            Follow.objects.filter(author=self.author).count(), self.THREADS
+        )
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).followers_count,
+            self.THREADS,
+        )
@@ -1,10 +1,21 @@
+import shutil
+import tempfile
+from io import BytesIO
 from http import HTTPStatus
+from unittest.mock import patch
 
-from django.test import Client, TestCase
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from posts import thumbnails
 from posts.forms import PostForm
 from posts.models import Group, Post, User
+from posts.storage import image_storage
+from posts.thumbnails import PlaceholderImageFile, PregeneratedThumbnailBackend
 
 
 class PostCreateFormTests(TestCase):
@@ -106,3 +117,133 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(
             post_edit.group.pk, form_data['group']
         )
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_PIPELINE='local')
+class PostImageFormTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Painter')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+
+    def test_create_post_with_image(self):
+        """Картинка сохраняется, миниатюра строится вне запроса."""
+        self.client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'С картинкой',
+                'image': SimpleUploadedFile(
+                    'small.gif', SMALL_GIF, content_type='image/gif'
+                ),
+            },
+        )
+        post = Post.objects.get(text='С картинкой')
+        self.assertTrue(image_storage.is_hashed(post.image.name))
+        self.assertTrue(post.image.name.startswith('posts/'))
+        geometry, options = settings.THUMBNAIL_SIZES[0]
+        backend = PregeneratedThumbnailBackend()
+        with patch.object(thumbnails, 'get_queue') as get_queue:
+            placeholder = backend.get_thumbnail(
+                post.image, geometry, **options
+            )
+        self.assertIsInstance(placeholder, PlaceholderImageFile)
+        get_queue.return_value.submit.assert_called_once()
+        thumbnails.generate(post.image.name, settings.THUMBNAIL_SIZES)
+        thumbnail = backend.get_thumbnail(post.image, geometry, **options)
+        self.assertNotIsInstance(thumbnail, PlaceholderImageFile)
+        self.assertTrue(thumbnail.exists())
+
+    def test_identical_images_share_file_and_thumbnail(self):
+        """Одинаковые загрузки хранятся одним файлом с общей миниатюрой."""
+        for text in ('Первый', 'Второй'):
+            self.client.post(reverse('posts:post_create'), data={
+                'text': text,
+                'image': SimpleUploadedFile(
+                    f'{text}.gif', SMALL_GIF, content_type='image/gif'
+                ),
+            })
+        first, second = Post.objects.filter(
+            text__in=['Первый', 'Второй']
+        )
+        self.assertEqual(first.image.name, second.image.name)
+        _, files = image_storage.listdir(
+            first.image.name.rsplit('/', 1)[0]
+        )
+        self.assertEqual(len(files), 1)
+        thumbnails.generate(first.image.name, settings.THUMBNAIL_SIZES)
+        geometry, options = settings.THUMBNAIL_SIZES[0]
+        backend = PregeneratedThumbnailBackend()
+        self.assertEqual(
+            backend.get_thumbnail(first.image, geometry, **options).name,
+            backend.get_thumbnail(second.image, geometry, **options).name,
+        )
+
+
+def jpeg_upload(size, name='photo.jpg', **save_options):
+    output = BytesIO()
+    Image.new('RGB', size, 'red').save(output, 'JPEG', **save_options)
+    return SimpleUploadedFile(name, output.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIZE=(100, 100))
+class ImageUploadTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def form(self, upload):
+        return PostForm(data={'text': 'Текст'}, files={'image': upload})
+
+    def test_image_is_resized_and_stripped(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: повернуть на 90°.
+        exif[0x010F] = 'Camera'
+        form = self.form(jpeg_upload((400, 200), exif=exif.tobytes()))
+        self.assertTrue(form.is_valid(), form.errors)
+        image = Image.open(form.cleaned_data['image'])
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (50, 100))
+        self.assertFalse(image.getexif())
+
+    @override_settings(IMAGE_MAX_PIXELS=1000)
+    def test_too_many_pixels(self):
+        form = self.form(jpeg_upload((100, 100)))
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['image'][0].code,
+                         'too_many_pixels')
+
+    @override_settings(IMAGE_MAX_UPLOAD_SIZE=100)
+    def test_file_too_large(self):
+        form = self.form(jpeg_upload((100, 100)))
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['image'][0].code,
+                         'file_too_large')
+
+    @override_settings(IMAGE_FORMAT='WEBP')
+    def test_webp_output(self):
+        form = self.form(jpeg_upload((40, 40)))
+        self.assertTrue(form.is_valid(), form.errors)
+        image = form.cleaned_data['image']
+        self.assertEqual(image.name, 'photo.webp')
+        self.assertEqual(Image.open(image).format, 'WEBP')
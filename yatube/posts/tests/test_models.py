@@ -1,7 +1,11 @@
+from importlib import import_module
+
+from django.apps import apps
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-from posts.models import Group, Post
+from posts import counters
+from posts.models import AuthorStats, Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -62,3 +66,74 @@ class GroupModelTest(TestCase):
         group = GroupModelTest.group
         expected_group_title = group.title
         self.assertEqual(str(group), expected_group_title)
+
+
+class CountersModelTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+
+    def test_counters_follow_rows(self):
+        """Счетчики меняются при создании и удалении записей."""
+        post = Post.objects.create(author=self.author, text='Текст')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.reader).following_count, 1
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        stats.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(stats.followers_count, 0)
+
+    def test_stale_post_save_keeps_comments_count(self):
+        """Сохранение устаревшей копии поста не сбрасывает счетчик."""
+        post = Post.objects.create(author=self.author, text='Текст')
+        Comment.objects.create(post=post, author=self.reader, text='К')
+        post.text = 'Новый текст'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_reconcile_fixes_drift(self):
+        """reconcile восстанавливает разошедшиеся счетчики."""
+        Post.objects.create(author=self.author, text='Текст')
+        AuthorStats.objects.filter(user=self.author).update(posts_count=7)
+        AuthorStats.objects.filter(user=self.reader).delete()
+        fixed = counters.reconcile()
+        self.assertEqual(fixed['posts_count'], 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 1
+        )
+        self.assertTrue(AuthorStats.objects.filter(user=self.reader))
+
+    def test_migration_fills_counters_in_constant_queries(self):
+        """Миграция 0009 заполняет счетчики без запросов на строку."""
+        migration = import_module('posts.migrations.0009_auto_20261018_1842')
+        for number in range(3):
+            post = Post.objects.create(author=self.author, text=f'{number}')
+            Comment.objects.create(post=post, author=self.reader, text='К')
+        Follow.objects.create(user=self.reader, author=self.author)
+        AuthorStats.objects.all().delete()
+        Post.objects.update(comments_count=0)
+        with self.assertNumQueries(4):
+            migration.fill_counters(apps, None)
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual((stats.posts_count, stats.followers_count), (3, 1))
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.reader).following_count, 1
+        )
+        self.assertEqual(
+            set(Post.objects.values_list('comments_count', flat=True)), {1}
+        )
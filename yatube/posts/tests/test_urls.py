@@ -1,6 +1,7 @@
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -39,6 +40,9 @@ class StaticURLTests(TestCase):
             'not found': '/unexisting_page/'
         }
 
+    def setUp(self):
+        cache.clear()
+
     def test_http_statuses(self) -> None:
         httpstatus = (
             (self.urls.get('/'), HTTPStatus.OK.value,
@@ -1,8 +1,24 @@
+import csv
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings,
+)
 from django.urls import reverse
+from django.utils import timezone
 
-from posts.models import Group, Post
+from posts import cache as feed_cache
+from posts import group_stats, timeline, trending
+from posts.models import (
+    AuthorStats, Comment, Follow, Group, Post, PostScore, TimelineEntry,
+)
+from posts.templatetags.post_cards import post_cards
 
 User = get_user_model()
 
@@ -26,6 +42,9 @@ class TaskPagesTests(TestCase):
         cls.authorized_client = Client()
         cls.authorized_client.force_login(cls.user)
 
+    def setUp(self):
+        cache.clear()
+
     def test_pages_uses_correct_template(self):
         """URL-адрес использует соответствующий шаблон."""
         templates_pages_names = {
@@ -83,3 +102,602 @@ class TaskPagesTests(TestCase):
                     kwargs={'username': 'tigr'})))
         user = response.context['page_obj'][0].author
         self.assertEqual(user, self.user)
+
+
+class CursorPaginatorViewsTests(TestCase):
+    POSTS_COUNT = 20
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='kot')
+        cls.group = Group.objects.create(
+            title='Группа пагинации',
+            slug='cursor_slug',
+            description='Описание',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'Пост {number}')
+            for number in range(cls.POSTS_COUNT)
+        )
+
+    def test_cursor_pages_cover_all_posts(self):
+        """Переход по курсорам показывает каждый пост ровно один раз."""
+        url = reverse('posts:group_list', kwargs={'slug': 'cursor_slug'})
+        seen = []
+        response = self.client.get(url)
+        while True:
+            page_obj = response.context['page_obj']
+            seen.extend(post.pk for post in page_obj)
+            if not page_obj.has_next():
+                break
+            response = self.client.get(url, {'cursor': page_obj.next_cursor})
+        self.assertEqual(len(seen), self.POSTS_COUNT)
+        self.assertEqual(len(set(seen)), self.POSTS_COUNT)
+        previous = self.client.get(
+            url, {'cursor': page_obj.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            [post.pk for post in previous], seen[:settings.MAX_RECORDS]
+        )
+
+    def test_page_fallback_and_broken_cursor(self):
+        """?page= работает по-старому, битый курсор дает первую страницу."""
+        url = reverse('posts:profile', kwargs={'username': 'kot'})
+        response = self.client.get(url, {'page': 2})
+        self.assertEqual(response.context['page_obj'].number, 2)
+        response = self.client.get(url, {'cursor': 'мусор'})
+        self.assertEqual(
+            len(response.context['page_obj']), settings.MAX_RECORDS
+        )
+
+
+class TimelineViewsTests(TransactionTestCase):
+    # Кеш подписок сбрасывается после коммита, поэтому без TestCase.
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='pisatel')
+        self.reader = User.objects.create_user(username='chitatel')
+        self.old_post = Post.objects.create(author=self.author, text='Старый')
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return [post.text for post in response.context['page_obj']]
+
+    def test_follow_backfills_and_unfollow_purges(self):
+        """Подписка дополняет ленту, отписка очищает ее."""
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=['pisatel'])
+        )
+        self.assertEqual(self.feed(), ['Старый'])
+        self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Новый'}
+        )
+        self.assertEqual(self.feed(), ['Новый', 'Старый'])
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=['pisatel'])
+        )
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_heavy_author_is_read_on_request(self):
+        """Посты популярного автора подмешиваются без раскладки."""
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=['pisatel'])
+        )
+        cache.clear()
+        self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Новый'}
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(post__text='Новый').exists()
+        )
+        self.assertEqual(self.feed(), ['Новый', 'Старый'])
+
+    def test_fanout_limit_crossed_both_ways(self):
+        """Посты не теряются, когда автор пересекает порог раскладки."""
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=['pisatel'])
+        )
+        with override_settings(TIMELINE_FANOUT_LIMIT=0):
+            cache.clear()
+            self.author_client.post(
+                reverse('posts:post_create'), {'text': 'Тяжелый'}
+            )
+            self.assertEqual(self.feed(), ['Тяжелый', 'Старый'])
+        # Срок множества тяжелых авторов истек, автор снова под порогом:
+        # новые посты раскладываются, история подмешивается до команды.
+        cache.clear()
+        self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Легкий'}
+        )
+        self.assertEqual(self.feed(), ['Легкий', 'Тяжелый', 'Старый'])
+        delivered = TimelineEntry.objects.filter(user=self.reader)
+        self.assertFalse(delivered.filter(post__text='Тяжелый'))
+        self.assertTrue(delivered.filter(post__text='Легкий'))
+        out = StringIO()
+        call_command('rebuild_timelines', pending=True, stdout=out)
+        self.assertIn('Разложена история авторов: 1', out.getvalue())
+        self.assertTrue(delivered.filter(post__text='Тяжелый'))
+        self.assertFalse(AuthorStats.objects.get(user=self.author).heavy)
+        cache.clear()
+        self.assertEqual(self.feed(), ['Легкий', 'Тяжелый', 'Старый'])
+        with override_settings(TIMELINE_FANOUT_LIMIT=0):
+            cache.clear()
+            self.author_client.post(
+                reverse('posts:post_create'), {'text': 'Снова тяжелый'}
+            )
+            self.assertEqual(
+                self.feed(),
+                ['Снова тяжелый', 'Легкий', 'Тяжелый', 'Старый'],
+            )
+        self.assertFalse(
+            TimelineEntry.objects.filter(post__text='Снова тяжелый').exists()
+        )
+
+
+class FeedCacheTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='kesh')
+
+    def test_new_post_invalidates_index(self):
+        """Новый пост сразу виден на закешированной главной."""
+        Post.objects.create(author=self.user, text='Первый')
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('posts:index'))
+        self.assertIsNone(response.context)
+        Post.objects.create(author=self.user, text='Второй')
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['page_obj'][0].text, 'Второй')
+        self.assertEqual(
+            feed_cache.stats(['index']), {'index': {'hit': 1, 'miss': 2}}
+        )
+
+    def test_follow_invalidates_profile(self):
+        """Подписка сбрасывает кеш профиля автора."""
+        reader = User.objects.create_user(username='chitatel')
+        client = Client()
+        client.force_login(reader)
+        url = reverse('posts:profile', kwargs={'username': 'kesh'})
+        self.assertFalse(client.get(url).context['following'])
+        Follow.objects.create(user=reader, author=self.user)
+        self.assertTrue(client.get(url).context['following'])
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='card_author')
+        cls.post = Post.objects.create(author=cls.user, text='Исходный')
+
+    def setUp(self):
+        cache.clear()
+
+    def cards(self):
+        posts = Post.objects.select_related('author', 'group')
+        return [card for post, card in post_cards(posts)]
+
+    def test_card_is_reused_until_post_changes(self):
+        self.assertIn('Исходный', self.cards()[0])
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигнала')
+        self.assertIn('Исходный', self.cards()[0])
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Отредактирован'
+        post.save()
+        self.assertIn('Отредактирован', self.cards()[0])
+
+    def test_new_comment_refreshes_card(self):
+        self.assertIn('Комментариев:</b> 0', self.cards()[0])
+        Comment.objects.create(post=self.post, author=self.user, text='К')
+        self.assertIn('Комментариев:</b> 1', self.cards()[0])
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='etag_author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='etag', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=['etag']),
+            reverse('posts:profile', args=['etag_author']),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        ]
+
+    def test_unchanged_pages_return_304(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('no-cache', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+                cached = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(cached.status_code, 304)
+
+    def test_guest_304_skips_database(self):
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_edit_changes_etag(self):
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_users_do_not_share_validators(self):
+        url = reverse('posts:index')
+        guest = self.client.get(url)
+        self.client.force_login(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=guest['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_post_detail_is_not_revalidated_for_users(self):
+        """После повторного входа форма комментария получает новый токен."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        first = client.get(url)
+        self.assertFalse(first.has_header('ETag'))
+        self.assertIn('private', first['Cache-Control'])
+        client.logout()
+        client.force_login(self.user)
+        response = client.get(url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 200)
+        token = response.context['csrf_token']
+        self.assertNotEqual(str(token), str(first.context['csrf_token']))
+        comment = client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий', 'csrfmiddlewaretoken': str(token)},
+        )
+        self.assertEqual(comment.status_code, 302)
+
+
+class QueryBudgetTests(TestCase):
+    """Число запросов каждой страницы не зависит от размера страницы."""
+
+    BUDGETS = {
+        'posts:index': 1,
+        'posts:group_list': 2,
+        'posts:profile': 3,
+        # Пользователю страница отдается без ETag (CSRF-токен в форме).
+        'posts:post_detail': 2,
+        'posts:follow_index': 2,
+        # Число групп, группы со статистикой, лучшие авторы.
+        'posts:group_index': 3,
+        # Число постов в рейтинге и страница с авторами и группами.
+        'posts:trending': 2,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='budget_author')
+        cls.reader = User.objects.create_user(username='budget_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='budget', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = cls.create_posts(1)[0]
+        group_stats.refresh()
+
+    @classmethod
+    def create_posts(cls, count):
+        posts = []
+        for number in range(count):
+            post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+            timeline.fan_out(post)
+            posts.append(post)
+        return posts
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def urls(self):
+        kwargs = {
+            'posts:index': {},
+            'posts:group_list': {'slug': 'budget'},
+            'posts:profile': {'username': 'budget_author'},
+            'posts:post_detail': {'post_id': self.post.pk},
+            'posts:follow_index': {},
+            'posts:group_index': {},
+            'posts:trending': {},
+        }
+        return {name: reverse(name, kwargs=kw) for name, kw in kwargs.items()}
+
+    def assert_budgets(self):
+        # Сессия и пользователь загружаются на каждый запрос.
+        for name, url in self.urls().items():
+            with self.subTest(view=name):
+                cache.clear()
+                with self.assertNumQueries(self.BUDGETS[name] + 2):
+                    self.client.get(url)
+
+    def test_small_page(self):
+        Comment.objects.create(post=self.post, author=self.reader, text='К')
+        self.assert_budgets()
+
+    def test_full_page(self):
+        posts = self.create_posts(settings.MAX_RECORDS * 2)
+        PostScore.objects.bulk_create(
+            PostScore(post=post, score=1) for post in posts
+        )
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.reader, text=f'К {number}')
+            for number in range(settings.MAX_RECORDS * 2)
+        )
+        self.assert_budgets()
+
+
+class GroupIndexTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.authors = [
+            User.objects.create_user(username=f'member{number}')
+            for number in range(3)
+        ]
+        cls.busy = Group.objects.create(
+            title='Людная', slug='busy', description=''
+        )
+        cls.quiet = Group.objects.create(
+            title='Тихая', slug='quiet', description=''
+        )
+        for number, author in enumerate(cls.authors):
+            for _ in range(number + 1):
+                Post.objects.create(author=author, group=cls.busy, text='П')
+        Post.objects.create(author=cls.authors[0], group=cls.quiet, text='П')
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(GROUP_TOP_AUTHORS=2)
+    def test_directory_reads_refreshed_stats(self):
+        group_stats.refresh()
+        empty = Group.objects.create(title='Новая', slug='new', description='')
+        groups = list(
+            self.client.get(reverse('posts:group_index')).context['page_obj']
+        )
+        self.assertEqual(groups, [self.busy, self.quiet, empty])
+        self.assertEqual(groups[0].stats.posts_count, 6)
+        self.assertEqual(
+            groups[0].stats.last_post_date,
+            self.busy.posts.latest('pub_date').pub_date,
+        )
+        self.assertEqual(
+            [top.author for top in groups[0].top_authors.all()],
+            [self.authors[2], self.authors[1]],
+        )
+        self.assertFalse(hasattr(groups[2], 'stats'))
+
+    def test_refresh_invalidates_directory(self):
+        """До пересчета каталог отдается из кеша, после — заново."""
+        url = reverse('posts:group_index')
+
+        def first_group():
+            content = self.client.get(url).content.decode()
+            return min(('Людная', 'Тихая'), key=content.index)
+
+        group_stats.refresh()
+        self.assertEqual(first_group(), 'Людная')
+        for _ in range(6):
+            Post.objects.create(
+                author=self.authors[0], group=self.quiet, text='П'
+            )
+        self.assertEqual(first_group(), 'Людная')
+        group_stats.refresh()
+        self.assertEqual(first_group(), 'Тихая')
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='trend_author')
+        cls.reader = User.objects.create_user(username='trend_reader')
+        cls.quiet = Post.objects.create(author=cls.author, text='Тихий')
+        cls.hot = Post.objects.create(author=cls.author, text='Горячий')
+
+    def setUp(self):
+        cache.clear()
+
+    def score(self, post):
+        return PostScore.objects.get(post=post).score
+
+    def test_comments_and_follows_raise_score(self):
+        for _ in range(3):
+            Comment.objects.create(post=self.hot, author=self.reader, text='К')
+        Follow.objects.create(user=self.reader, author=self.author)
+        follow = settings.TRENDING_WEIGHTS['follow']
+        self.assertEqual(self.score(self.quiet), follow)
+        self.assertEqual(
+            self.score(self.hot),
+            3 * settings.TRENDING_WEIGHTS['comment'] + follow,
+        )
+        posts = self.client.get(reverse('posts:trending')).context['posts']
+        self.assertEqual(posts, [self.hot, self.quiet])
+
+    def test_refollow_does_not_raise_score_again(self):
+        """Цикл подписка-отписка-подписка учитывается один раз."""
+        client = Client()
+        client.force_login(self.reader)
+        follow = reverse('posts:profile_follow', args=['trend_author'])
+        unfollow = reverse('posts:profile_unfollow', args=['trend_author'])
+        for url in (follow, unfollow, follow):
+            client.get(url)
+        self.assertEqual(
+            self.score(self.hot), settings.TRENDING_WEIGHTS['follow']
+        )
+
+    @override_settings(TRENDING_MIN_SCORE=0.3)
+    def test_decay_drops_faded_posts(self):
+        Comment.objects.create(post=self.hot, author=self.reader, text='К')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(trending.decay(0.5), 1)
+        self.assertEqual(self.score(self.hot), 0.75)
+        self.assertFalse(PostScore.objects.filter(post=self.quiet))
+
+    def test_rebuild_uses_comment_age(self):
+        Comment.objects.create(post=self.hot, author=self.reader, text='К')
+        later = timezone.now() + timedelta(
+            seconds=settings.TRENDING_HALF_LIFE
+        )
+        self.assertEqual(trending.rebuild(later), 1)
+        self.assertAlmostEqual(self.score(self.hot), 0.5, places=3)
+
+
+@override_settings(COMMENTS_PER_PAGE=2)
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='commenter')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        for number in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {number}'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.url = reverse('posts:post_detail', args=[self.post.pk])
+
+    def test_comments_are_paginated(self):
+        content = self.client.get(self.url).content.decode()
+        self.assertIn('Комментарий 2', content)
+        self.assertIn('Комментарий 1', content)
+        self.assertNotIn('Комментарий 0', content)
+        self.assertIn('comments-more', content)
+
+    def test_add_comment_invalidates_fragment(self):
+        self.client.get(self.url)
+        self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Свежий'},
+        )
+        self.assertIn('Свежий', self.client.get(self.url).content.decode())
+
+    def test_json_endpoint_continues_thread(self):
+        url = reverse('posts:comments', args=[self.post.pk])
+        first = self.client.get(url).json()
+        self.assertEqual(len(first['comments']), 2)
+        second = self.client.get(first['next']).json()
+        self.assertEqual(
+            [comment['text'] for comment in second['comments']],
+            ['Комментарий 0'],
+        )
+        self.assertIsNone(second['next'])
+
+
+class SearchViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='poet')
+        cls.group = Group.objects.create(
+            title='Стихи', slug='poems', description='Описание'
+        )
+        cls.match = Post.objects.create(
+            author=cls.author, group=cls.group, text='Мороз и солнце'
+        )
+        cls.other = Post.objects.create(
+            author=cls.author, text='Солнце, день чудесный'
+        )
+        Post.objects.create(author=cls.author, text='Буря мглою')
+
+    def found(self, **params):
+        response = self.client.get(reverse('posts:search'), params)
+        return {post.pk for post in response.context['page_obj']}
+
+    def test_search_uses_index(self):
+        """Поиск находит слова, учитывает фильтры и правки."""
+        self.assertEqual(
+            self.found(q='солнце'), {self.match.pk, self.other.pk}
+        )
+        self.assertEqual(
+            self.found(q='солнце', group='poems'), {self.match.pk}
+        )
+        self.other.text = 'Буря'
+        self.other.save()
+        self.assertEqual(self.found(q='солнце'), {self.match.pk})
+        self.match.delete()
+        self.assertEqual(self.found(q='солнце'), set())
+
+    def test_query_syntax_is_escaped(self):
+        """Спецсимволы FTS5 в запросе не ломают поиск."""
+        self.assertEqual(self.found(q='"мороз* ('), {self.match.pk})
+
+    @override_settings(SEARCH_BACKEND='posts.search.IcontainsBackend')
+    def test_icontains_backend(self):
+        """Без FTS посты сохраняются и ищутся подстрокой."""
+        post = Post.objects.create(author=self.author, text='Ночь тиха')
+        post.text = 'Ночь светла'
+        post.save()
+        self.assertEqual(self.found(q='светла'), {post.pk})
+        self.assertEqual(self.found(q='Мороз', group='poems'), {self.match.pk})
+        post.delete()
+        self.assertEqual(self.found(q='светла'), set())
+
+
+class ExportViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='exporter')
+        cls.group = Group.objects.create(
+            title='Выгрузка', slug='export', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост'
+        )
+        Post.objects.create(author=cls.author, text='Без группы')
+        Comment.objects.create(post=cls.post, author=cls.author, text='Ком')
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def export(self, **params):
+        response = self.client.get(reverse('posts:export'), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_group_jsonl(self):
+        """JSON Lines содержит посты группы с комментариями."""
+        lines = self.export(group='export').splitlines()
+        self.assertEqual(len(lines), 1)
+        record = json.loads(lines[0])
+        self.assertEqual(record['text'], 'Пост')
+        self.assertEqual(record['comments'][0]['text'], 'Ком')
+
+    def test_export_author_csv(self):
+        """CSV содержит строки постов и комментариев автора."""
+        content = self.export(author='exporter', format='csv')
+        rows = list(csv.reader(content.splitlines()))
+        self.assertEqual([row[0] for row in rows[1:]].count('post'), 2)
+        self.assertEqual([row[0] for row in rows[1:]].count('comment'), 1)
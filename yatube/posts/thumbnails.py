@@ -0,0 +1,158 @@
+"""Фоновая подготовка миниатюр картинок постов.
+
+После сохранения поста с картинкой все размеры из THUMBNAIL_SIZES
+строятся в пуле процессов. Тег {% thumbnail %} через
+PregeneratedThumbnailBackend только читает готовую миниатюру из kvstore
+sorl: если ее еще нет, шаблон получает заглушку, а построение ставится
+в очередь, и запрос не ждет декодирования и сжатия картинки.
+"""
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.templatetags.static import static
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import DummyImageFile, ImageFile
+
+from core.metrics import timed
+from posts.models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+class PlaceholderImageFile(DummyImageFile):
+    @property
+    def url(self):
+        return static(settings.THUMBNAIL_PLACEHOLDER)
+
+
+def invalidate_image(name):
+    """Сбросить кеш страниц с постами, где показана картинка name."""
+    from posts.signals import invalidate_post
+
+    posts = Post.objects.filter(image=name).select_related('author', 'group')
+    for post in posts:
+        invalidate_post(Post, post)
+
+
+class LocalQueue:
+    """Очередь-заглушка: выполняет задачу сразу в текущем процессе."""
+
+    def submit(self, name, sizes):
+        try:
+            generate(name, sizes)
+        except Exception:
+            logger.exception('Не удалось построить миниатюры %s', name)
+        else:
+            invalidate_image(name)
+
+
+def _finish(name, future):
+    # Колбэк выполняется в служебном потоке пула родительского процесса.
+    try:
+        future.result()
+        invalidate_image(name)
+    except Exception:
+        logger.exception('Не удалось построить миниатюры %s', name)
+    finally:
+        connections.close_all()
+
+
+def _start_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context(
+        'forkserver' if 'forkserver' in methods else 'spawn'
+    )
+
+
+class ProcessQueue:
+    def submit(self, name, sizes):
+        global _executor
+        if _executor is None:
+            # fork из многопоточного процесса (потоки сервера, пул ASGI,
+            # служебный поток пула) может унести в дочерний процесс
+            # захваченную блокировку логирования или драйвера базы.
+            # Рабочие процессы стартуют с чистого интерпретатора и
+            # настраивают Django до того, как распакуют первую задачу.
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                mp_context=_start_context(),
+                initializer=django.setup,
+            )
+        future = _executor.submit(generate, name, sizes)
+        future.add_done_callback(partial(_finish, name))
+
+
+QUEUES = {
+    'local': LocalQueue,
+    'process': ProcessQueue,
+}
+
+
+def get_queue():
+    return QUEUES[settings.THUMBNAIL_PIPELINE]()
+
+
+def generate(name, sizes):
+    backend = ThumbnailBackend()
+    # Ключ миниатюры в sorl зависит от хранилища исходника, поэтому
+    # картинка открывается в том же хранилище, что и Post.image.
+    source = ImageFile(name, Post._meta.get_field('image').storage)
+    with timed('thumbnail'):
+        for geometry, options in sizes:
+            backend.get_thumbnail(source, geometry, **options)
+
+
+def schedule(post):
+    """Поставить в очередь все размеры миниатюр картинки поста."""
+    if not post.image:
+        return
+    name = post.image.name
+    transaction.on_commit(
+        lambda: get_queue().submit(name, settings.THUMBNAIL_SIZES)
+    )
+
+
+class PregeneratedThumbnailBackend(ThumbnailBackend):
+    def _normalize_options(self, source, options):
+        # Те же умолчания, что в ThumbnailBackend.get_thumbnail, чтобы
+        # имя миниатюры совпадало с построенной фоновым процессом.
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        return options
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        with timed('thumbnail'):
+            return self._lookup(file_, geometry_string, **options)
+
+    def _lookup(self, file_, geometry_string, **options):
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        requested = dict(options)
+        source = ImageFile(file_)
+        name = self._get_thumbnail_filename(
+            source, geometry_string, self._normalize_options(source, options)
+        )
+        cached = default.kvstore.get(ImageFile(name, default.storage))
+        if cached:
+            return cached
+        pending = f'thumbnail:pending:{name}'
+        if cache.add(pending, True, settings.THUMBNAIL_PENDING_TIMEOUT):
+            get_queue().submit(source.name, [(geometry_string, requested)])
+        return PlaceholderImageFile(geometry_string)
@@ -0,0 +1,173 @@
+"""Лента подписок с доставкой при записи (fan-out on write).
+
+При публикации пост раскладывается в TimelineEntry каждого подписчика,
+поэтому follow_index читает одну таблицу вместо соединения Follow и Post.
+Посты авторов, у которых подписчиков больше TIMELINE_FANOUT_LIMIT, не
+раскладываются: они подмешиваются в ленту при чтении, пока автор не
+вернется под порог и rebuild_timelines не разложит его историю.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
+
+from posts.models import AuthorStats, Follow, Post, TimelineEntry
+
+HEAVY_AUTHORS_KEY = 'timeline:unfanned_authors'
+
+
+def _authors():
+    authors = cache.get(HEAVY_AUTHORS_KEY)
+    if authors is None:
+        authors = sync_heavy_authors()
+    return authors
+
+
+def heavy_authors():
+    """Множество id авторов, чьи новые посты не раскладываются."""
+    return _authors()[0]
+
+
+def merged_authors():
+    """Множество id авторов, чьи посты подмешиваются в ленту при чтении."""
+    return _authors()[1]
+
+
+def sync_heavy_authors():
+    """Отметить авторов, пересекших TIMELINE_FANOUT_LIMIT вверх.
+
+    Вернуть (тяжелые, подмешиваемые). Флаг AuthorStats.heavy держит
+    подмешивание при чтении, пока посты автора не разложены: автор,
+    вернувшийся под порог, снова раскладывает новые посты, но его
+    история остается в подмешивании до deliver_pending(). Здесь только
+    флаги и множества — вызов идет из запроса, который первым не нашел
+    их в кеше.
+    """
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    rows = AuthorStats.objects.filter(
+        Q(heavy=True) | Q(followers_count__gt=limit)
+    ).values_list('user_id', 'heavy', 'followers_count')
+    heavy, merged, joined = set(), set(), []
+    for user_id, flagged, followers in rows:
+        merged.add(user_id)
+        if followers > limit:
+            heavy.add(user_id)
+            if not flagged:
+                joined.append(user_id)
+    if joined:
+        AuthorStats.objects.filter(user_id__in=joined).update(heavy=True)
+    authors = heavy, merged
+    cache.set(HEAVY_AUTHORS_KEY, authors, settings.TIMELINE_HEAVY_AUTHORS_TTL)
+    return authors
+
+
+def deliver_pending():
+    """Разложить историю авторов, вернувшихся под порог, вернуть их число.
+
+    Выполняется командой rebuild_timelines: подписчикам достается до
+    TIMELINE_FANOUT_LIMIT копий каждого поста автора. Новые посты таких
+    авторов к этому моменту уже раскладываются, повторная доставка
+    безопасна: записи вставляются без конфликтов.
+    """
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    pending = list(
+        AuthorStats.objects.filter(
+            heavy=True, followers_count__lte=limit
+        ).values_list('user_id', flat=True)
+    )
+    if not pending:
+        return 0
+    sync_heavy_authors()
+    for author_id in pending:
+        _deliver_history(author_id)
+        AuthorStats.objects.filter(
+            user_id=author_id, followers_count__lte=limit
+        ).update(heavy=False)
+    sync_heavy_authors()
+    return len(pending)
+
+
+def _deliver_history(author_id):
+    followers = Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True
+    )
+    posts = list(
+        Post.objects.filter(author_id=author_id).values_list('pk', 'pub_date')
+    )
+    # bulk_create собирает записи в список, поэтому по подписчику за раз.
+    for user_id in followers.iterator():
+        _push(
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        )
+
+
+def _push(entries):
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out(post):
+    """Доставить новый пост в ленты всех подписчиков автора."""
+    if post.author_id in heavy_authors():
+        return
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        'user_id', flat=True
+    )
+    _push(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user, author):
+    """Добавить в ленту user уже опубликованные посты author."""
+    if author.pk in merged_authors():
+        return
+    posts = Post.objects.filter(author=author).values_list('pk', 'pub_date')
+    _push(
+        TimelineEntry(user=user, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts.iterator()
+    )
+
+
+def purge(user, author):
+    """Убрать из ленты user посты author после отписки."""
+    TimelineEntry.objects.filter(user=user, post__author=author).delete()
+
+
+def rebuild(user):
+    """Пересобрать ленту user с нуля по текущим подпискам."""
+    TimelineEntry.objects.filter(user=user).delete()
+    follows = Follow.objects.filter(user=user).select_related('author')
+    for follow in follows:
+        backfill(user, follow.author)
+
+
+def feed(user):
+    """Посты ленты подписок user с ключами сортировки feed_date и feed_pk.
+
+    Без тяжелых авторов страница читается по индексу TimelineEntry
+    (user, -pub_date, -post) без сортировки. Посты тяжелых авторов
+    подмешиваются условием OR, и тогда выборка сортируется целиком.
+    """
+    heavy = merged_authors()
+    followed_heavy = []
+    if heavy:
+        followed_heavy = list(
+            Follow.objects.filter(user=user, author__in=heavy)
+            .values_list('author', flat=True)
+        )
+    if not followed_heavy:
+        return Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_date=F('timeline_entries__pub_date'),
+            feed_pk=F('timeline_entries__post'),
+        )
+    delivered = Q(
+        pk__in=TimelineEntry.objects.filter(user=user).values('post')
+    )
+    return Post.objects.filter(
+        delivered | Q(author__in=followed_heavy)
+    ).annotate(feed_date=F('pub_date'), feed_pk=F('pk'))
@@ -0,0 +1,117 @@
+"""Лента популярного: посты по затухающему рейтингу.
+
+Рейтинг хранится в PostScore и меняется инкрементно из сигналов:
+комментарий прибавляет TRENDING_WEIGHTS['comment'] к посту, новая
+подписка — TRENDING_WEIGHTS['follow'] к постам автора за последние
+TRENDING_WINDOW секунд (пара подписчик-автор учитывается раз за окно).
+Команда decay_trending раз в TRENDING_DECAY_INTERVAL умножает все
+рейтинги на множитель с периодом полураспада TRENDING_HALF_LIFE и
+удаляет угасшие строки. Страница популярного читает первые строки
+индекса (-score, -post), а не агрегирует комментарии.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from posts.cache import bump
+from posts.models import Comment, Post, PostScore
+
+FOLLOW_SEEN_KEY = 'trending:follow:{}:{}'
+
+
+def window_start(now=None):
+    now = now or timezone.now()
+    return now - timedelta(seconds=settings.TRENDING_WINDOW)
+
+
+def add(post_id, amount):
+    scores = PostScore.objects.filter(post_id=post_id)
+    if not scores.update(score=F('score') + amount):
+        PostScore.objects.get_or_create(post_id=post_id)
+        scores.update(score=F('score') + amount)
+
+
+def comment_added(post_id):
+    add(post_id, settings.TRENDING_WEIGHTS['comment'])
+
+
+def follow_added(user_id, author_id):
+    # Повторная подписка после отписки рейтинг не поднимает: пара
+    # учитывается раз за окно, дальше ее посты уже вне окна.
+    if not cache.add(
+        FOLLOW_SEEN_KEY.format(user_id, author_id), True,
+        settings.TRENDING_WINDOW,
+    ):
+        return
+    ids = list(
+        Post.objects.filter(
+            author_id=author_id, pub_date__gte=window_start()
+        ).values_list('pk', flat=True)
+    )
+    if not ids:
+        return
+    PostScore.objects.bulk_create(
+        (PostScore(post_id=pk) for pk in ids),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    PostScore.objects.filter(post_id__in=ids).update(
+        score=F('score') + settings.TRENDING_WEIGHTS['follow']
+    )
+
+
+def decay_factor():
+    return 0.5 ** (
+        settings.TRENDING_DECAY_INTERVAL / settings.TRENDING_HALF_LIFE
+    )
+
+
+def decay(factor=None):
+    """Затухание всех рейтингов, вернуть число удаленных строк."""
+    factor = decay_factor() if factor is None else factor
+    with transaction.atomic():
+        PostScore.objects.update(score=F('score') * factor)
+        removed, _ = PostScore.objects.filter(
+            score__lt=settings.TRENDING_MIN_SCORE
+        ).delete()
+    bump('trending')
+    return removed
+
+
+def rebuild(now=None):
+    """Пересчитать рейтинг по комментариям окна, вернуть число постов.
+
+    Нужен при первом запуске и после сбоев: время подписок не хранится,
+    поэтому в пересчете учитываются только комментарии.
+    """
+    now = now or timezone.now()
+    weight = settings.TRENDING_WEIGHTS['comment']
+    scores = defaultdict(float)
+    comments = Comment.objects.filter(
+        created__gte=window_start(now), post__isnull=False
+    ).values_list('post', 'created')
+    for post_id, created in comments.iterator():
+        age = (now - created).total_seconds()
+        scores[post_id] += weight * 0.5 ** (age / settings.TRENDING_HALF_LIFE)
+    rows = [
+        PostScore(post_id=post_id, score=score)
+        for post_id, score in scores.items()
+        if score >= settings.TRENDING_MIN_SCORE
+    ]
+    with transaction.atomic():
+        PostScore.objects.all().delete()
+        PostScore.objects.bulk_create(rows, batch_size=1000)
+    bump('trending')
+    return len(rows)
+
+
+def ranking():
+    """Лучшие TRENDING_SIZE постов по рейтингу с авторами и группами."""
+    return PostScore.objects.select_related(
+        'post__author', 'post__group'
+    ).order_by('-score', '-post_id')[:settings.TRENDING_SIZE]
@@ -1,16 +1,22 @@
 from django.urls import path
 
 from posts.views import (
+    group_index,
     group_posts,
     index,
     post_create,
     post_detail,
+    post_comments,
     post_edit,
     profile,
     add_comment,
+    export_posts,
     follow_index,
     profile_follow,
+    profile_follow_batch,
     profile_unfollow,
+    search,
+    trending,
 )
 
 app_name = 'posts'
@@ -19,11 +25,17 @@ urlpatterns = [
     path('posts/<int:post_id>/edit/', post_edit, name='post_edit'),
     path('create/', post_create, name='post_create'),
     path('', index, name='index'),
+    path('group/', group_index, name='group_index'),
     path('group/<slug:slug>/', group_posts, name='group_list'),
     path('profile/<str:username>/', profile, name='profile'),
     path('posts/<int:post_id>/', post_detail, name='post_detail'),
     path('posts/<int:post_id>/comment/', add_comment, name='add_comment'),
+    path('posts/<int:post_id>/comments/', post_comments, name='comments'),
     path('follow/', follow_index, name='follow_index'),
+    path('follow/batch/', profile_follow_batch, name='follow_batch'),
+    path('trending/', trending, name='trending'),
+    path('search/', search, name='search'),
+    path('export/', export_posts, name='export'),
     path(
         'profile/<str:username>/follow/',
         profile_follow,
@@ -2,22 +2,80 @@ from django.urls import reverse
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db.models import F, Prefetch
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_POST
+from django.template.loader import render_to_string
 
-from posts.forms import CommentForm, PostForm
-from posts.models import Group, Post, User, Follow
+from core import parallel
+from posts import follows, thumbnails, timeline
+from posts import trending as ranking
+from posts.exporters import CONTENT_TYPES, export
+from posts.cache import cache_feed, cached_fragment, conditional_feed
+from posts.forms import CommentForm, PostForm, SearchForm
+from posts.models import (
+    Comment, Follow, Group, GroupTopAuthor, Post, User,
+)
+from posts.pagination import CursorPaginator
+from posts.search import get_backend as search_backend
 
 
-def paginator_function(posts, request):
-    paginator = Paginator(posts, settings.MAX_RECORDS)
+def paginator_function(posts, request, **cursor_options):
     page_number = request.GET.get("page")
-    return paginator.get_page(page_number)
+    if page_number is not None and settings.PAGINATION_PAGE_FALLBACK:
+        paginator = Paginator(posts, settings.MAX_RECORDS)
+        return paginator.get_page(page_number)
+    paginator = CursorPaginator(posts, settings.MAX_RECORDS, **cursor_options)
+    return paginator.get_page(request.GET.get("cursor"))
 
 
-@cache_page(20 * 15)
+def comment_page(post_id, cursor):
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    )
+    paginator = CursorPaginator(
+        comments, settings.COMMENTS_PER_PAGE, key_field='created'
+    )
+    return paginator.get_page(cursor)
+
+
+def comments_url(post_id, page_obj):
+    if not page_obj.has_next():
+        return None
+    url = reverse('posts:comments', kwargs={'post_id': post_id})
+    return f'{url}?cursor={page_obj.next_cursor}'
+
+
+def post_scopes(request, post_id):
+    # Вызывается и для ETag, и для кеша страницы: автор ищется один раз.
+    if getattr(request, '_post_scopes', None) is None:
+        scopes = [f'post:{post_id}']
+        username = Post.objects.filter(pk=post_id).values_list(
+            'author__username', flat=True
+        ).first()
+        if username is not None:
+            scopes.append(f'author:{username}')
+        request._post_scopes = scopes
+    return request._post_scopes
+
+
+def index_scopes(request):
+    return ['index']
+
+
+def group_scopes(request, slug):
+    return [f'group:{slug}']
+
+
+def profile_scopes(request, username):
+    return [f'author:{username}']
+
+
+@conditional_feed(index_scopes)
+@cache_feed('index', index_scopes)
 def index(request):
-    posts = Post.objects.all()
+    posts = Post.objects.select_related('author', 'group')
     page_obj = paginator_function(posts, request)
     context = {
         'page_obj': page_obj,
@@ -25,11 +83,13 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@conditional_feed(group_scopes)
+@cache_feed('group_list', group_scopes)
 def group_posts(request, slug):
     """Display all posts group."""
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author')
+    posts = group.posts.select_related('author', 'group')
     page_obj = paginator_function(posts, request)
     context = {
         'group': group,
@@ -38,14 +98,70 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+def directory_scopes(request):
+    return ['groups']
+
+
+@conditional_feed(directory_scopes)
+@cache_feed('group_index', directory_scopes)
+def group_index(request):
+    """Каталог групп по готовой статистике из refresh_group_stats."""
+    groups = Group.objects.select_related('stats').prefetch_related(
+        Prefetch(
+            'top_authors',
+            queryset=GroupTopAuthor.objects.select_related('author'),
+        )
+    ).order_by(F('stats__posts_count').desc(nulls_last=True), 'title')
+    paginator = Paginator(groups, settings.GROUPS_PER_PAGE)
+    context = {'page_obj': paginator.get_page(request.GET.get('page'))}
+    return render(request, 'posts/group_index.html', context)
+
+
+def trending_scopes(request):
+    return ['trending']
+
+
+@cache_feed('trending', trending_scopes)
+def trending(request):
+    """Популярные посты по рейтингу из PostScore."""
+    paginator = Paginator(ranking.ranking(), settings.MAX_RECORDS)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'page_obj': page_obj,
+        'posts': [score.post for score in page_obj],
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+@conditional_feed(profile_scopes)
+@cache_feed('profile', profile_scopes)
 def profile(request, username):
-    current_author = get_object_or_404(User, username=username)
-    posts = current_author.posts.all()
-    following = (request.user.is_authenticated and Follow.objects.filter(
-        user=request.user,
-        author=current_author).exists()
+    user = request.user
+    authenticated = user.is_authenticated
+
+    def author():
+        return get_object_or_404(
+            User.objects.select_related('stats'), username=username
+        )
+
+    def page():
+        posts = Post.objects.filter(
+            author__username=username
+        ).select_related('author', 'group')
+        page_obj = paginator_function(posts, request)
+        # Страница читается в потоке пула, а не при рендеринге.
+        page_obj.object_list = list(page_obj.object_list)
+        return page_obj
+
+    def following():
+        return authenticated and Follow.objects.filter(
+            user=user, author__username=username
+        ).exists()
+
+    # Автор, страница постов и подписка не зависят друг от друга.
+    current_author, page_obj, following = parallel.fetch(
+        author, page, following
     )
-    page_obj = paginator_function(posts, request)
     context = {
         'author': current_author,
         'page_obj': page_obj,
@@ -54,10 +170,25 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_feed(post_scopes, anonymous_only=True)
+@cache_feed('post_detail', post_scopes, anonymous_only=True)
 def post_detail(request, post_id):
-    posts = get_object_or_404(Post, pk=post_id)
+    posts = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
     form = CommentForm(request.POST or None)
-    comments = posts.comments.all()
+    cursor = request.GET.get('cursor')
+
+    def build():
+        page_obj = comment_page(post_id, cursor)
+        return render_to_string('posts/includes/comment_list.html', {
+            'page_obj': page_obj,
+            'more_url': comments_url(post_id, page_obj),
+        })
+
+    comments = cached_fragment(
+        'comments', [f'comments:{post_id}'], [post_id, cursor], build
+    )
     return render(
         request,
         'posts/post_detail.html',
@@ -65,14 +196,92 @@ def post_detail(request, post_id):
     )
 
 
+def post_comments(request, post_id):
+    """Следующая страница комментариев в JSON для подгрузки без перехода."""
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    cursor = request.GET.get('cursor')
+
+    def build():
+        page_obj = comment_page(post_id, cursor)
+        return {
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'author_url': reverse(
+                        'posts:profile', args=[comment.author.username]
+                    ),
+                    'text': comment.text,
+                    'created': comment.created.isoformat(),
+                }
+                for comment in page_obj
+            ],
+            'next': comments_url(post_id, page_obj),
+        }
+
+    data = cached_fragment(
+        'comments', [f'comments:{post_id}'], ['json', post_id, cursor], build
+    )
+    return JsonResponse(data)
+
+
+def search(request):
+    """Полнотекстовый поиск по постам с фильтрами по группе и автору."""
+    form = SearchForm(request.GET or None)
+    page_obj = None
+    if form.is_valid():
+        results = search_backend().search(
+            form.cleaned_data['q'],
+            group=form.cleaned_data['group'],
+            author=form.cleaned_data['author'],
+        )
+        paginator = Paginator(results, settings.MAX_RECORDS)
+        page_obj = paginator.get_page(request.GET.get('page'))
+    query = request.GET.copy()
+    query.pop('page', None)
+    context = {
+        'form': form,
+        'page_obj': page_obj,
+        'page_query': query.urlencode(),
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@login_required
+def export_posts(request):
+    """Выгрузка постов группы или автора в JSON Lines или CSV."""
+    file_format = request.GET.get('format', 'jsonl')
+    if file_format not in CONTENT_TYPES:
+        raise Http404('Неизвестный формат')
+    posts = Post.objects.all()
+    if request.GET.get('group'):
+        group = get_object_or_404(Group, slug=request.GET['group'])
+        posts = posts.filter(group=group)
+    elif request.GET.get('author'):
+        author = get_object_or_404(User, username=request.GET['author'])
+        posts = posts.filter(author=author)
+    else:
+        raise Http404('Укажите group или author')
+    response = StreamingHttpResponse(
+        export(posts, file_format, settings.EXPORT_CHUNK_SIZE),
+        content_type=CONTENT_TYPES[file_format],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="posts.{file_format}"'
+    )
+    return response
+
+
 @login_required
 def post_create(request):
     template = 'posts/create_post.html'
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         obj = form.save(commit=False)
         obj.author = request.user
         obj.save()
+        timeline.fan_out(obj)
+        thumbnails.schedule(obj)
         return redirect('posts:profile', obj.author)
     context = {
         'form': form,
@@ -91,7 +300,9 @@ def post_edit(request, post_id):
         files=request.FILES or None,
     )
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('posts:post_detail', post_id)
     template = 'posts/create_post.html'
     context = {'form': form, 'is_edit': True}
@@ -111,9 +322,17 @@ def add_comment(request, post_id):
 
 
 @login_required
+@cache_feed(
+    'follow_index',
+    lambda request: ['index', f'follow:{request.user.pk}'],
+)
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator_function(post_list, request)
+    post_list = timeline.feed(request.user).select_related(
+        'author', 'group'
+    )
+    page_obj = paginator_function(
+        post_list, request, key_field='feed_date', pk_field='feed_pk'
+    )
     context = {
         'page_obj': page_obj,
     }
@@ -122,18 +341,30 @@ def follow_index(request):
 
 @login_required
 def profile_follow(request, username):
-    user = request.user
     author = get_object_or_404(User, username=username)
-    is_follower = Follow.objects.filter(user=user, author=author)
-    if user != author and not is_follower.exists():
-        Follow.objects.create(user=user, author=author)
+    follows.follow(request.user, author)
     return redirect(reverse('posts:profile', args=[username]))
 
 
+@login_required
+@require_POST
+def profile_follow_batch(request):
+    """Подписаться сразу на несколько авторов: author=a&author=b."""
+    usernames = request.POST.getlist('author')
+    if len(usernames) > settings.FOLLOW_BATCH_LIMIT:
+        return JsonResponse(
+            {'error': f'Не больше {settings.FOLLOW_BATCH_LIMIT} авторов'},
+            status=400,
+        )
+    authors = User.objects.filter(username__in=usernames)
+    followed = follows.follow_many(request.user, authors)
+    return JsonResponse(
+        {'followed': [author.username for author in followed]}
+    )
+
+
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    is_follower = Follow.objects.filter(user=request.user, author=author)
-    if is_follower.exists():
-        is_follower.delete()
+    follows.unfollow(request.user, author)
     return redirect('posts:profile', username=author)
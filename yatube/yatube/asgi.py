@@ -0,0 +1,10 @@
+"""ASGI-вход: uvicorn yatube.asgi:application.
+
+Настройки и прогрев шаблонов берутся из yatube.wsgi.
+"""
+from django.conf import settings
+
+from core.asgi import AsgiHandler
+from yatube.wsgi import application as wsgi_application
+
+application = AsgiHandler(wsgi_application, settings.ASGI_THREADS)
@@ -0,0 +1,16 @@
+"""Профиль настроек выбирается переменной окружения YATUBE_ENV.
+
+dev (по умолчанию) — отладка и кеш в памяти процесса, prod — боевой
+запуск. Остальное задается переменными YATUBE_* из base и prod.
+"""
+import os
+
+ENVIRONMENT = os.getenv('YATUBE_ENV', 'dev')
+
+if ENVIRONMENT == 'prod':
+    from yatube.settings.prod import *  # noqa: F401,F403
+elif ENVIRONMENT == 'dev':
+    from yatube.settings.dev import *  # noqa: F401,F403
+else:
+    # ImproperlyConfigured из модуля настроек manage.py молча проглатывает.
+    raise ValueError(f'Неизвестный YATUBE_ENV: {ENVIRONMENT}')
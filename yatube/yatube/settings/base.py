@@ -0,0 +1,327 @@
+"""Общие настройки профилей dev и prod."""
+import importlib.util
+import os
+import tempfile
+
+BASE_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+SECRET_KEY = '+e41$q_265xv+5=g@1ln_wni!yd$a3rj5r2-*vtp9fcpc$)92i'
+
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    'localhost',
+    '127.0.0.1',
+    '[::1]',
+    'testserver',
+]
+
+CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+INSTALLED_APPS = [
+    'about.apps.AboutConfig',
+    'core.apps.CoreConfig',
+    'users.apps.UsersConfig',
+    'posts.apps.PostsConfig',
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'sorl.thumbnail',
+]
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Миниатюры строятся в фоне; 'local' выполняет задачи в текущем процессе.
+THUMBNAIL_BACKEND = 'posts.thumbnails.PregeneratedThumbnailBackend'
+THUMBNAIL_PIPELINE = 'process'
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_SIZES = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+THUMBNAIL_PLACEHOLDER = 'img/placeholder.svg'
+THUMBNAIL_PENDING_TIMEOUT = 60
+
+# Загрузка картинок (posts.uploads): ограничения проверяются по заголовку,
+# принятая картинка уменьшается и пересжимается без метаданных.
+# IMAGE_FORMAT = 'WEBP' сохраняет все картинки в WebP.
+IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+IMAGE_MAX_PIXELS = 50 * 1000 * 1000
+IMAGE_MAX_SIZE = (1920, 1920)
+IMAGE_QUALITY = 85
+IMAGE_FORMAT = os.getenv('YATUBE_IMAGE_FORMAT') or None
+# dedupe_images не удаляет файлы моложе этого срока: пост еще сохраняется.
+IMAGE_GC_GRACE = 60 * 60
+# Загрузки больше этого размера пишутся во временный файл, а не в память.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+
+MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATES = [
+    {
+        'BACKEND': 'core.template_backends.InstrumentedDjangoTemplates',
+        'DIRS': [TEMPLATES_DIR],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+
+# Потоки, в которых yatube.asgi выполняет синхронные view.
+ASGI_THREADS = int(os.getenv('YATUBE_ASGI_THREADS', '8'))
+# Потоки core.parallel для независимых запросов одной страницы; у каждого
+# свое соединение с базой. Меньше 2 — запросы выполняются по очереди.
+FETCH_THREADS = int(os.getenv('YATUBE_FETCH_THREADS', '8'))
+
+# Компилировать все шаблоны при старте воркера (включено в prod).
+TEMPLATES_WARM_UP = False
+
+
+MAX_RECORDS = 15
+
+# Старые ссылки вида ?page=N обслуживаются классическим Paginator.
+PAGINATION_PAGE_FALLBACK = True
+
+# Авторы с большим числом подписчиков читаются в ленту без раскладки;
+# историю вернувшихся под порог раскладывает rebuild_timelines --pending.
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_HEAVY_AUTHORS_TTL = 60 * 5
+TIMELINE_BATCH_SIZE = 1000
+
+SEARCH_ADMIN_LIMIT = 1000
+
+EXPORT_CHUNK_SIZE = 2000
+
+API_PAGE_SIZE = 20
+
+# Сколько авторов можно передать в одном запросе follow/batch/.
+FOLLOW_BATCH_LIMIT = 100
+
+# Входит в ETag: после выкладки новые шаблоны не прячутся за 304.
+RELEASE = os.getenv('YATUBE_RELEASE', '')
+
+# Время жизни кеша страниц в секундах; свежесть обеспечивают версии.
+FEED_CACHE_TTL = {
+    'index': 60 * 5,
+    'group_list': 60 * 5,
+    'profile': 60 * 5,
+    'post_detail': 60 * 5,
+    'follow_index': 60,
+    'comments': 60 * 10,
+    'post_card': 60 * 60,
+    'group_index': 60 * 10,
+    # Рейтинг меняется без сброса версий, свежесть задает время жизни.
+    'trending': 60,
+}
+
+# Каталог групп: групп на странице и авторов в статистике группы.
+GROUPS_PER_PAGE = 50
+GROUP_TOP_AUTHORS = 3
+
+# Лента популярного (posts.trending): вес событий, период полураспада
+# и интервал запуска decay_trending в секундах, окно для подписок.
+TRENDING_WEIGHTS = {'comment': 1.0, 'follow': 0.5}
+TRENDING_HALF_LIFE = 60 * 60 * 24
+TRENDING_DECAY_INTERVAL = 60 * 60
+TRENDING_WINDOW = 60 * 60 * 24 * 7
+TRENDING_MIN_SCORE = 0.05
+TRENDING_SIZE = 100
+
+# Комментарии под постом выводятся порциями, следующие подгружаются JSON.
+COMMENTS_PER_PAGE = 20
+
+
+# База задается окружением; по умолчанию локальный файл SQLite.
+DATABASES = {
+    'default': {
+        'ENGINE': os.getenv('YATUBE_DB_ENGINE', 'django.db.backends.sqlite3'),
+        'NAME': os.getenv(
+            'YATUBE_DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')
+        ),
+        'USER': os.getenv('YATUBE_DB_USER', ''),
+        'PASSWORD': os.getenv('YATUBE_DB_PASSWORD', ''),
+        'HOST': os.getenv('YATUBE_DB_HOST', ''),
+        'PORT': os.getenv('YATUBE_DB_PORT', ''),
+        'CONN_MAX_AGE': int(os.getenv('YATUBE_DB_CONN_MAX_AGE', '0')),
+        # Файл, а не память: потоки тестов пишут параллельно через WAL,
+        # общий кеш in-memory SQLite блокирует таблицы целиком. Имя свое
+        # у каждого запуска, чтобы параллельные прогоны не делили файл.
+        'TEST': {
+            'NAME': os.getenv(
+                'YATUBE_TEST_DB_NAME',
+                os.path.join(
+                    tempfile.gettempdir(),
+                    f'yatube_test_{os.getpid()}.sqlite3',
+                ),
+            ),
+        },
+    },
+}
+
+# Таблица FTS5 создается миграцией 0010 только на SQLite; на других
+# базах поиск идет через icontains.
+SEARCH_BACKEND = os.getenv('YATUBE_SEARCH_BACKEND') or (
+    'posts.search.SqliteFTSBackend'
+    if DATABASES['default']['ENGINE'].endswith('sqlite3')
+    else 'posts.search.IcontainsBackend'
+)
+
+# Прагмы для каждого нового соединения с SQLite (core.signals).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+# Реплики только для чтения: пути к файлам SQLite через запятую, локально
+# они заменяют настоящие реплики. В тестах реплики зеркалят default.
+for number, name in enumerate(
+    filter(None, os.getenv('YATUBE_DB_REPLICAS', '').split(','))
+):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Страницы, которые можно читать с реплики, и окно read-your-writes.
+REPLICA_VIEWS = [
+    'posts:index',
+    'posts:group_index',
+    'posts:trending',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+    'api:posts',
+    'api:post_detail',
+    'api:comments',
+    'api:group_posts',
+    'api:profile_posts',
+    'api:feed',
+]
+REPLICA_PIN_SECONDS = 5
+
+# /metrics/ доступен только локально; границы гистограмм в миллисекундах.
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+METRICS_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file': (
+        'django.core.cache.backends.filebased.FileBasedCache',
+        os.path.join(tempfile.gettempdir(), 'yatube_cache'),
+    ),
+    'memcached': (
+        'django.core.cache.backends.memcached.MemcachedCache',
+        '127.0.0.1:11211',
+    ),
+    'redis': ('django_redis.cache.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+# Клиентские библиотеки, без которых бэкенд не запустится.
+CACHE_CLIENTS = {'memcached': 'memcache', 'redis': 'django_redis'}
+
+
+def cache_config(kind, stand_in=False):
+    """CACHES для бэкенда kind, адрес можно задать YATUBE_CACHE_LOCATION.
+
+    С stand_in (только для разработки), если клиент memcached или redis
+    не установлен, локальной заменой служит файловый кеш: в отличие от
+    locmem он общий для всех воркеров. Боевой профиль оставляет
+    запрошенный бэкенд, и отсутствие клиента сообщает проверка core.E002.
+    """
+    client = CACHE_CLIENTS.get(kind)
+    if stand_in and client and importlib.util.find_spec(client) is None:
+        kind = 'file'
+    backend, location = CACHE_BACKENDS[kind]
+    return {
+        'default': {
+            'BACKEND': backend,
+            'LOCATION': os.getenv('YATUBE_CACHE_LOCATION', location),
+        }
+    }
+
+
+CACHES = cache_config('locmem')
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_L10N = True
+
+USE_TZ = True
+
+STATIC_URL = '/static/'
+
+LOGIN_URL = 'users:login'
+LOGIN_REDIRECT_URL = 'posts:index'
+
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'yatube': {
+            'handlers': ['console'],
+            'level': os.getenv('YATUBE_LOG_LEVEL', 'WARNING'),
+        },
+    },
+}
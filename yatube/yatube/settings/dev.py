@@ -0,0 +1,9 @@
+"""Локальная разработка и тесты."""
+import os
+
+from yatube.settings.base import *  # noqa: F401,F403
+from yatube.settings.base import cache_config
+
+DEBUG = True
+
+CACHES = cache_config(os.getenv('YATUBE_CACHE', 'locmem'), stand_in=True)
@@ -0,0 +1,36 @@
+"""Боевой запуск: YATUBE_ENV=prod."""
+import os
+
+from yatube.settings.base import *  # noqa: F401,F403
+from yatube.settings.base import (
+    ALLOWED_HOSTS,
+    DATABASES,
+    SECRET_KEY,
+    TEMPLATES,
+    cache_config,
+)
+
+DEBUG = False
+
+SECRET_KEY = os.getenv('YATUBE_SECRET_KEY', SECRET_KEY)
+ALLOWED_HOSTS = os.getenv(
+    'YATUBE_ALLOWED_HOSTS', ','.join(ALLOWED_HOSTS)
+).split(',')
+
+# Кеш лент и фрагментов должен быть общим для всех воркеров.
+CACHES = cache_config(os.getenv('YATUBE_CACHE', 'file'))
+
+# Соединения переиспользуются между запросами одного воркера.
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = int(os.getenv('YATUBE_DB_CONN_MAX_AGE', '60'))
+
+# Шаблоны разбираются один раз на процесс и прогреваются при старте.
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['debug'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+TEMPLATES_WARM_UP = True
@@ -1,7 +1,17 @@
+import logging
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+if settings.TEMPLATES_WARM_UP:
+    from core.template_backends import compile_templates
+
+    for name, error in compile_templates().items():
+        logging.getLogger('yatube.templates').error(
+            'Шаблон %s не компилируется: %s', name, error
+        )